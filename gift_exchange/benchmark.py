@@ -0,0 +1,68 @@
+#! /usr/bin/python
+
+# vim: set ai sw=4 et:
+
+"""Time GiftExchange.generate_exchange() with each way of undoing guesses.
+
+For each size, an exchange of that many participants is made from random
+families of 1 to 4 people, and generate_exchange() is timed on it, with
+the trail of CandidateSets (trail=True) and with deep copies of the
+recipient lists (trail=False).  Copying takes time and memory that grow
+with the square of the exchange at every guess, so it is only run up to
+--copy_limit participants.
+"""
+
+import sys
+import time
+import random
+import argparse
+import name_chooser
+
+FAMILY_SIZES = (1, 4)
+
+def make_exchange(size, rng):
+    """Return a reset GiftExchange of size participants in random families."""
+    ge = name_chooser.GiftExchange()
+    count = 0
+    while count < size:
+        family_size = min(rng.randint(*FAMILY_SIZES), size - count)
+        ge.add_family(['p%d' % i for i in range(count, count + family_size)])
+        count += family_size
+    ge.reset_exchange()
+    return ge
+
+def time_exchange(size, trail, seed):
+    """Return (seconds, found) for one generate_exchange() of size people."""
+    ge = make_exchange(size, random.Random(seed))
+    random.seed(seed)
+    start = time.time()
+    found = ge.generate_exchange(trail=trail)
+    return time.time() - start, found
+
+def parse_args(args):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 500, 5000],
+                        help='Numbers of participants to time.')
+    parser.add_argument('--copy_limit', type=int, default=500,
+                        help='Largest exchange to time with copying.')
+    parser.add_argument('--seed', type=int, default=1,
+                        help='Random seed for the families and the search.')
+    return parser.parse_args(args)
+
+def main(args):
+    # Copying searches recursively, a level for each giver.
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 10 * max(args.sizes)))
+    print "%12s %12s %12s" % ("participants", "trail", "copy")
+    for size in args.sizes:
+        times = []
+        for trail in (True, False):
+            if not trail and size > args.copy_limit:
+                times.append("skipped")
+                continue
+            seconds, found = time_exchange(size, trail, args.seed)
+            times.append("%.3fs" % seconds if found else "failed")
+        print "%12d %12s %12s" % (size, times[0], times[1])
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -5,6 +5,25 @@
 import random
 import time
 import copy
+import collections
+import itertools
+import heapq
+import multiprocessing
+
+# How many random recipients generate_matching() tries for each giver
+# before looking through the giver's list for a free one.
+MATCHING_GUESSES = 3
+
+# How many random recipients sample_pairing() draws for each giver before
+# choosing among those outside the giver's family.
+PAIRING_GUESSES = 8
+
+# The methods generate_batch() can make exchanges with.
+BATCH_METHODS = ('generate_exchange', 'generate_matching')
+
+# How many bits bits() takes off the bottom of a mask, one at a time,
+# before finding the rest in the mask's binary digits.
+LOWEST_BITS = 8
 
 # The main class for a gift exchange
 class GiftExchange(object):
@@ -20,7 +39,7 @@ class GiftExchange(object):
        exchange, families are added one at a time using the add_family()
        method.  A family is just a list of names.
 
-       There are 2 methods for generating a complete exchange:
+       There are 3 methods for generating a complete exchange:
        1) generate_exchange().  This method uses constraint propagation and
           searching to generate the giver/receiver pairs.  If no pairing
           of names meets the criteria, this method will return False;
@@ -28,9 +47,27 @@ class GiftExchange(object):
           have a dictionary mapping givers (key) to recipients (value).
        2) generate_pairing().  This method is much less sophisticated.
           It simply generates random permutations of all the participants'
-          names until one of the pairings meets the constraints.  If no
-          pairing of names matches the criteria, this method will continue
-          trying forever.
+          names until one of the pairings meets the constraints.  If a
+          family is more than half of the exchange, no pairing of names can
+          match the criteria, and this method returns False at once.  Even
+          so, with one large family it may take very many tries, so
+          generate_pairing(sample=True) instead builds a pairing a giver at
+          a time, in bounded time (see sample_pairing()).
+       3) generate_matching().  This method treats the exchange as a
+          bipartite graph of givers and recipients, with an edge for each
+          possible recipient in self.recips, and finds a random perfect
+          matching of it with the Hopcroft-Karp algorithm.  It returns
+          True or False, and fills in self.recips, as generate_exchange()
+          does, but never searches: if there is no exchange, it knows as
+          soon as it finds the largest matching, so it can handle
+          exchanges with many thousands of participants.
+
+       Many exchanges can be generated at once with generate_batch(), either
+       independently, in parallel, or one after another with no giver giving
+       to the same recipient twice (say, one for each of the next ten
+       years).  Pairs to leave out of every exchange, such as those of past
+       years, are given to exclude_pairs(), and taken out of each giver's
+       possible recipients by reset_exchange().
 
        A gift exchange will reject addition of a family if any of the names
        in that family are duplicates (either of existing names in the exchange
@@ -50,8 +87,9 @@ class GiftExchange(object):
            ge.show()
 
         Class Methods:
-            __init__(self):
-                Initialize the class instance variables.
+            __init__(self, quiet=False):
+                Initialize the class instance variables (and say so, unless
+                quiet).
             show(self):     
                 Print the class instance variables in a nice format
             add_family(self, family):
@@ -61,24 +99,52 @@ class GiftExchange(object):
                 Assign the recipient to the giver in the exchange.
             eliminate(self, giver, recip):
                 Remove the recipient from the giver's list of possible
-                recipients in the exchange.
+                recipients in the exchange (moving the last one on the list
+                into its place).
+            index_recips(self):
+                Rebuild the indexes of the recips dictionary, after
+                changing it other than through the methods here.
+            exclude_pairs(self, pairs):
+                Never pair these givers with these recipients (from the next
+                reset_exchange() on).  pairs is a list of (giver, recipient)
+                pairs, or a dictionary of givers to recipients.
             reset_exchange(self):
                 Reset the recips dictionary to its initial state.
                 This means that each giver's list of possible recipients is
-                everyone not in that giver's family.
-            generate_exchange(self):
+                everyone not in that giver's family, less any excluded pairs.
+            generate_exchange(self, trail=True):
                 Given an initialized recips dictionary, generate a random
                 exchange with each participant giving to and receiving from
                 a single other participant.
+                The search is done on CandidateSets, which undo failed
+                guesses from a trail, or with trail=False, on deep copies
+                of the recips dictionary.
                 This routine can be called multiple times, but will only
                 generate a new exchange if the exchange is reset (via the
                 reset_exchange() method), between calls.
-            generate_pairing(self):
+            generate_matching(self):
+                Find a random exchange as a perfect matching of givers
+                to their possible recipients.  Like generate_exchange(),
+                this returns True or False and sets self.recips, and
+                generates a new exchange only after reset_exchange().
+            generate_pairing(self, sample=False):
                 Generates random permutations of the participants until one
                 of them meets the constraints (no one gives to herself or
-                to a family member).
+                to a family member), or with sample=True, builds one with
+                sample_pairing().  Returns False if no pairing is possible.
                 This routine can be called repeatedly, and will generate a new
                 pairing each time.
+            sample_pairing(self):
+                Return a random pairing that meets the constraints, made
+                one giver at a time, and how many tries it took.
+            generate_batch(self, count, seed=None, processes=None,
+                           distinct=False, method='generate_exchange'):
+                Return a list of count exchanges (dictionaries of givers to
+                recipients, or None where none could be made), each made
+                with method from a fresh exchange of the same families and
+                excluded pairs, and a random seed of its own.  They are
+                made in parallel, or with distinct=True, one after another,
+                each leaving out the pairs of the ones before.
             show_pairing(self):
                 Show the exchange's current pairing.  If generate_pairing() has
                 not been called, yet, then will show "None."
@@ -93,8 +159,9 @@ class GiftExchange(object):
             Extra constraints on an exchange can be applied by calling the
             assign() and eliminate() methods directly."""
 
-    def __init__(self):
-        print "Initializing new GiftExchange."
+    def __init__(self, quiet=False):
+        if not quiet:
+            print "Initializing new GiftExchange."
         self.namelist = []
         self.family_list = []
         self.family_dict = {}
@@ -102,6 +169,24 @@ class GiftExchange(object):
         self.pairing = None
         self.tries = 0
         self.recips = {}
+        # Indexes of self.recips, kept up to date with it.  Participants are
+        # numbered in name list order (index), and each giver's possible
+        # recipients, and each recipient's possible givers, are integers with
+        # a bit set for each one (recip_masks and giver_masks).  giver_counts
+        # says how many possible givers each recipient has.  indexed is
+        # False when they need to be rebuilt with index_recips().
+        # positions maps a giver to where each of his or her possible
+        # recipients is in self.recips[giver], so eliminate() can take one
+        # out without searching the list.  A giver's positions are made the
+        # first time eliminate() needs them, as making them for everyone
+        # would double the memory of the lists.
+        self.index = {}
+        self.recip_masks = {}
+        self.giver_masks = {}
+        self.giver_counts = {}
+        self.positions = {}
+        self.indexed = True
+        self.excluded_pairs = set()
         self.verbose = False
 
     def show(self):
@@ -141,16 +226,35 @@ class GiftExchange(object):
         # recipients the same as the list of everyone already in the exchange.
         for giver in family:
             self.recips[giver] = list(self.namelist)
+        # Widening every mask for each family would take longer than
+        # building them once, when they are next needed.
+        self.indexed = False
+        self.positions = {}
 
         # Add the new family to the family list.
         self.family_list.append(family)
 
         # Add each member of the new family to the lists.
         for name in family:
+            self.index[name] = len(self.namelist)
             self.namelist.append(name)
             self.family_dict[name] = self.num_families
         self.num_families += 1
 
+    def index_recips(self):
+        """Rebuild the indexes from self.recips."""
+        n = len(self.namelist)
+        givers = dict((name, []) for name in self.namelist)
+        for giver in self.namelist:
+            self.recip_masks[giver] = mask_of([self.index[r] for r in self.recips[giver]], n)
+            for recip in self.recips[giver]:
+                givers[recip].append(self.index[giver])
+        for recip in self.namelist:
+            self.giver_masks[recip] = mask_of(givers[recip], n)
+            self.giver_counts[recip] = len(givers[recip])
+        self.positions = {}
+        self.indexed = True
+
     def assign(self, giver, recip):
         """Eliminate alll other recipients but the given one and propagate.
            return True if successful, False if there is a contradiction."""
@@ -158,42 +262,99 @@ class GiftExchange(object):
         return all(self.eliminate(giver, r) for r in other_recips)
 
     def eliminate(self, giver, recip):
-        if not recip in self.recips[giver]:
+        if not self.indexed:
+            self.index_recips()
+        g_bit = 1 << self.index[giver]
+        r_bit = 1 << self.index[recip]
+        if not self.recip_masks[giver] & r_bit:
             return True
-        self.recips[giver].remove(recip)
+        # Move the last recipient into recip's place (the order of the list
+        # doesn't matter).
+        rlist = self.recips[giver]
+        positions = self.positions.get(giver)
+        if positions is None:
+            positions = dict((r, k) for (k, r) in enumerate(rlist))
+            self.positions[giver] = positions
+        k = positions.pop(recip)
+        last = rlist.pop()
+        if last != recip:
+            rlist[k] = last
+            positions[last] = k
+        self.recip_masks[giver] ^= r_bit
+        self.giver_masks[recip] ^= g_bit
+        self.giver_counts[recip] -= 1
         if len(self.recips[giver]) == 0:
             return False
         elif len(self.recips[giver]) == 1:
             r2 = self.recips[giver][0]
-            if not all (self.eliminate(g2, r2) for g2 in self.namelist if g2 != giver):
+            other_givers = [self.namelist[g2] for g2 in bits(self.giver_masks[r2] & ~g_bit)]
+            if not all (self.eliminate(g2, r2) for g2 in other_givers):
                 return False
 
-        poss_givers = [g for g in self.namelist if recip in self.recips[g]]
-        if len(poss_givers) == 0:
+        poss_givers = self.giver_counts[recip]
+        if poss_givers == 0:
             return False
-        elif len(poss_givers) == 1:
-            return self.assign(poss_givers[0], recip)
+        elif poss_givers == 1:
+            g2 = self.giver_masks[recip].bit_length() - 1
+            return self.assign(self.namelist[g2], recip)
         return True
 
+    def exclude_pairs(self, pairs):
+        if isinstance(pairs, dict):
+            pairs = pairs.items()
+        self.excluded_pairs.update(pairs)
+
     def reset_exchange(self):
+        if self.excluded_pairs:
+            excluded = self.excluded_pairs
+            for giver in self.namelist:
+                self.recips[giver] = \
+                    [r for r in self.namelist if self.family_dict[giver] != self.family_dict[r]
+                     and (giver, r) not in excluded]
+            self.index_recips()
+            return
+        all_mask = (1 << len(self.namelist)) - 1
+        family_masks = [sum(1 << self.index[name] for name in f) for f in self.family_list]
         for giver in self.namelist:
             self.recips[giver] = \
                 [r for r in self.namelist if self.family_dict[giver] != self.family_dict[r]]
+            # Families are both ways, so a participant's possible givers are
+            # the same as his or her possible recipients.
+            mask = all_mask & ~family_masks[self.family_dict[giver]]
+            self.recip_masks[giver] = mask
+            self.giver_masks[giver] = mask
+            self.giver_counts[giver] = len(self.recips[giver])
+        self.positions = {}
+        self.indexed = True
 
-    def generate_exchange(self):
+    def generate_exchange(self, trail=True):
         """generate_exchange:
            Given the current set of possible giver->recipient combinations, search
            for a pairing.  This assumes that the primary constraints have already been
            applied (giver doesn't give to him/her self, giver doesn't give to a family
            member), so we just try to get a list where each giver has a single
-           recipient, and each recipient has a single giver."""
+           recipient, and each recipient has a single giver.
+           By default the search is done on CandidateSets, which undo a failed
+           guess from their trail.  With trail=False, self.recips itself is
+           searched, deep-copying it to undo each guess."""
+
+        if trail:
+            candidates = CandidateSets(self.namelist, self.recips)
+            if not candidates.search(self.verbose):
+                return False
+            for (giver, recip) in candidates.exchange().items():
+                self.recips[giver] = [recip]
+            self.index_recips()
+            return True
            
         # Is the exchange already screwed up?
         if any(len(self.recips[g])==0 for g in self.namelist):
             return False
-        # Is the exchange already solved?
+        # Is the exchange already solved?  (Lists set by reset_exchange()
+        # have not been through eliminate(), so two givers may be down to
+        # the same recipient.)
         if all(len(self.recips[g])==1 for g in self.namelist):
-            return True
+            return len(set(self.recips[g][0] for g in self.namelist)) == len(self.namelist)
 
         # Start making guesses.
         # Start with one of the givers who has the least number of possible recipients.
@@ -210,6 +371,7 @@ class GiftExchange(object):
             # Always start from the same spot.
             # self.recips = saved_recips.copy()
             self.recips = copy.deepcopy(saved_recips)
+            self.index_recips()
             if self.verbose:
                 print "  Trying %s gives to %s" % (g,r)
                 if False:
@@ -218,18 +380,130 @@ class GiftExchange(object):
             if not self.assign(g,r):
                 # if self.verbose: print "  Done trying %s gives to %s" % (g,r)
                 continue
-            if self.generate_exchange():
+            if self.generate_exchange(trail=False):
                 # if self.verbose: print "  Trying %s gives to %s succeeded." % (g,r)
                 return True
             # if self.verbose: print "  Done trying %s gives to %s (next)" % (g,r)
         return False
 
+    def generate_matching(self):
+        """generate_matching:
+           Find a random giver->recipient pairing by bipartite matching.
+           Each giver may be matched to any of his or her possible recipients
+           in self.recips, so this honors the family constraints and any
+           assign()/eliminate() calls.  Givers first take random free
+           recipients, then Hopcroft-Karp augmenting paths match the rest.
+           If the largest matching leaves anyone out, no exchange is
+           possible and False is returned with self.recips unchanged.
+           Otherwise each giver's list becomes his or her one recipient."""
+
+        # Is the exchange already screwed up?
+        if any(len(self.recips[g])==0 for g in self.namelist):
+            return False
+        # A family can only give to (and get from) everyone else, so no
+        # family can be more than half of the exchange.
+        if any(2 * len(f) > len(self.namelist) for f in self.family_list):
+            return False
+
+        recips = self.recips
+        match_giver = {}    # giver -> recipient
+        match_recip = {}    # recipient -> giver
+
+        def rotated(rlist):
+            # Visit a giver's recipients from a random starting point.
+            start = random.randrange(len(rlist))
+            return itertools.chain(itertools.islice(rlist, start, None),
+                                   itertools.islice(rlist, 0, start))
+
+        # Greedy start: givers with the fewest possible recipients first,
+        # and otherwise in a random order, each take a random free
+        # recipient, guessing a few times before looking through the list.
+        givers = list(self.namelist)
+        random.shuffle(givers)
+        givers.sort(key=lambda g: len(recips[g]))
+        for g in givers:
+            rlist = recips[g]
+            guesses = [random.choice(rlist) for _ in range(MATCHING_GUESSES)]
+            for r in itertools.chain(guesses, rotated(rlist)):
+                if r not in match_recip:
+                    match_giver[g] = r
+                    match_recip[r] = g
+                    break
+
+        infinity = len(givers) + 1
+        while len(match_giver) < len(givers):
+            # Breadth first search from the free givers, through matched
+            # recipients to their givers, to the nearest free recipients.
+            free = [g for g in givers if g not in match_giver]
+            dist = dict.fromkeys(givers, infinity)
+            for g in free:
+                dist[g] = 0
+            free_dist = infinity
+            queue = collections.deque(free)
+            while queue:
+                g = queue.popleft()
+                if dist[g] >= free_dist:
+                    continue
+                for r in recips[g]:
+                    g2 = match_recip.get(r)
+                    if g2 is None:
+                        # Givers further than this are not needed.
+                        free_dist = dist[g] + 1
+                        break
+                    elif dist[g2] == infinity:
+                        dist[g2] = dist[g] + 1
+                        queue.append(g2)
+            if free_dist == infinity:
+                if self.verbose:
+                    print "  Only %d of %d givers can be matched." % \
+                        (len(match_giver), len(givers))
+                return False
+
+            # Depth first search along the layers for disjoint shortest
+            # augmenting paths, and flip each one found.
+            for root in free:
+                stack = [(root, rotated(recips[root]))]
+                path = []
+                while stack:
+                    g, rest = stack[-1]
+                    for r in rest:
+                        g2 = match_recip.get(r)
+                        if g2 is None:
+                            if dist[g] + 1 == free_dist:
+                                path.append(r)
+                                break
+                        elif dist[g2] == dist[g] + 1:
+                            path.append(r)
+                            stack.append((g2, rotated(recips[g2])))
+                            break
+                    else:
+                        # Dead end: no path through g this phase.
+                        dist[g] = infinity
+                        stack.pop()
+                        if path:
+                            path.pop()
+                        continue
+                    if len(path) == len(stack):
+                        for (g, _), r in zip(stack, path):
+                            match_giver[g] = r
+                            match_recip[r] = g
+                        break
+
+        for g in givers:
+            self.recips[g] = [match_giver[g]]
+        self.index_recips()
+        return True
+
     # Create random pairings (just permutations of the name list), until one of them
     # meets the necessary criteria.
     # Current criteria are:
     #    - No one gives to a family member
     #    - No one gives to herself.  (Which is taken care of by the above.)
-    def generate_pairing(self):
+    # With sample=True, build one pairing a giver at a time instead (see
+    # sample_pairing()), which takes bounded time however large the families.
+    # Either way, if a family is more than half of the exchange no pairing is
+    # possible, so return False rather than trying forever.
+    def generate_pairing(self, sample=False):
         def is_good(pairing):
             for (giver, recipient) in pairing:
                 if self.family_dict[giver] == self.family_dict[recipient]:
@@ -241,14 +515,143 @@ class GiftExchange(object):
             random.shuffle(recipient_list)
             return zip(giver_list, recipient_list)
 
-        tries = 0
-        pairing = gen_random_pairing(self.namelist)
-        while not is_good(pairing):
+        if any(2 * len(f) > len(self.namelist) for f in self.family_list):
+            self.pairing = None
+            self.tries = 0
+            return False
+
+        if sample:
+            pairing, tries = self.sample_pairing()
+        else:
+            tries = 0
             pairing = gen_random_pairing(self.namelist)
-            tries += 1
+            while not is_good(pairing):
+                pairing = gen_random_pairing(self.namelist)
+                tries += 1
 
         self.pairing = pairing
         self.tries = tries
+        return True
+
+    def sample_pairing(self):
+        """sample_pairing:
+           Make a random pairing one giver at a time, in a random order.
+           Each giver gets a random recipient outside his or her family,
+           except that a pairing must stay possible for everyone after:
+           that is, no family's remaining givers and remaining recipients
+           may add up to more than the people still to be paired.  When a
+           family is at that limit, the giver must give to it (unless it
+           is the giver's own family).  Nothing is ever undone, so this
+           takes bounded time.  Pairings are random, but not all pairings
+           are equally likely.
+           Assumes no family is more than half of the exchange.
+           Returns (pairing, tries), where tries counts the random
+           recipients that were drawn from the giver's family, and had to
+           be drawn again."""
+        family = self.family_dict
+        # The recipients left, in all and by family, and where each is in
+        # those lists, so they can be drawn and removed in constant time.
+        left = list(self.namelist)
+        left_index = dict((name, i) for (i, name) in enumerate(left))
+        family_left = [list(f) for f in self.family_list]
+        family_index = dict((name, i) for f in family_left for (i, name) in enumerate(f))
+        givers_left = [len(f) for f in self.family_list]
+        # Heap of (-(givers + recipients left), family), to find a family
+        # at the limit.  Entries are out of date if the count has changed.
+        load = [(-2 * len(f), i) for (i, f) in enumerate(self.family_list)]
+        heapq.heapify(load)
+
+        def remove(items, index, name):
+            # Remove name from items by moving the last item into its place.
+            i = index.pop(name)
+            last = items.pop()
+            if last != name:
+                items[i] = last
+                index[last] = i
+
+        def full_families(remaining):
+            # The (at most two) families at the limit.
+            full = []
+            while load:
+                count, f = load[0]
+                if -count != givers_left[f] + len(family_left[f]):
+                    heapq.heappop(load)
+                elif -count == remaining:
+                    full.append(heapq.heappop(load))
+                else:
+                    break
+            for entry in full:
+                heapq.heappush(load, entry)
+            return [f for (_, f) in full]
+
+        givers = list(self.namelist)
+        random.shuffle(givers)
+        recipient = {}
+        tries = 0
+        for (done, giver) in enumerate(givers):
+            f = family[giver]
+            full = [x for x in full_families(len(givers) - done) if x != f]
+            if full:
+                recip = random.choice(family_left[full[0]])
+            else:
+                recip = None
+                for _ in range(PAIRING_GUESSES):
+                    guess = random.choice(left)
+                    if family[guess] != f:
+                        recip = guess
+                        break
+                    tries += 1
+                if recip is None:
+                    recip = random.choice([r for r in left if family[r] != f])
+            recipient[giver] = recip
+            remove(left, left_index, recip)
+            remove(family_left[family[recip]], family_index, recip)
+            givers_left[f] -= 1
+            for x in (f, family[recip]):
+                heapq.heappush(load, (-(givers_left[x] + len(family_left[x])), x))
+
+        return [(giver, recipient[giver]) for giver in self.namelist], tries
+
+    def generate_batch(self, count, seed=None, processes=None, distinct=False,
+                       method='generate_exchange'):
+        """generate_batch:
+           Make count exchanges, each from a fresh copy of this exchange's
+           families and excluded pairs, with method (generate_exchange or
+           generate_matching), and return them as a list of dictionaries of
+           givers to recipients, with None for any that could not be made.
+           Each exchange gets its own random seed, drawn from seed, so the
+           same seed gives the same exchanges however they are run.
+           The exchanges are made in parallel, in a pool of processes
+           (processes=1 makes them here, one at a time).  With
+           distinct=True, they are made in order, each excluding the pairs
+           of all the ones before it, so no one gives to the same person
+           twice; that has to be done one at a time.
+           Raises ValueError if method is not one of BATCH_METHODS."""
+        if method not in BATCH_METHODS:
+            raise ValueError("generate_batch() can't make exchanges with %r" % (method,))
+        rng = random.Random(seed)
+        seeds = [rng.getrandbits(32) for _ in range(count)]
+        if distinct:
+            excluded = set(self.excluded_pairs)
+            exchanges = []
+            for exchange_seed in seeds:
+                exchange = build_exchange(
+                    (self.family_list, excluded, exchange_seed, method))
+                if exchange is not None:
+                    excluded.update(exchange.items())
+                exchanges.append(exchange)
+            return exchanges
+
+        tasks = [(self.family_list, self.excluded_pairs, exchange_seed, method)
+                 for exchange_seed in seeds]
+        if processes == 1 or count <= 1:
+            return [build_exchange(task) for task in tasks]
+        pool = multiprocessing.Pool(processes)
+        try:
+            return pool.map(build_exchange, tasks)
+        finally:
+            pool.close()
+            pool.join()
 
     # Print a pairing nicely.
     def show_pairing(self):
@@ -258,6 +661,225 @@ class GiftExchange(object):
         for p in self.pairing:
             print "%8s gives to %s." % p
 
+def build_exchange(task):
+    """Make one exchange for GiftExchange.generate_batch().
+       task is (families, excluded pairs, random seed, method).  Returns a
+       dictionary of givers to recipients, or None if there is no exchange.
+       (A function, not a method, so that a process pool can run it.)
+       The searches use the random module, so it is seeded for the task,
+       and its state is put back afterwards for the caller."""
+    families, excluded, seed, method = task
+    state = random.getstate()
+    random.seed(seed)
+    try:
+        ge = GiftExchange(quiet=True)
+        for family in families:
+            ge.add_family(family)
+        ge.exclude_pairs(excluded)
+        ge.reset_exchange()
+        if not getattr(ge, method)():
+            return None
+        return dict((giver, ge.recips[giver][0]) for giver in ge.namelist)
+    finally:
+        random.setstate(state)
+
+def bits(mask):
+    """Generate the numbers of the bits set in mask, lowest first."""
+    for _ in range(LOWEST_BITS):
+        if not mask:
+            return
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+    # Taking one bit at a time off a long mask copies it each time, so
+    # find the rest of the bits in its binary digits instead, lowest first.
+    digits = bin(mask)[:1:-1]
+    i = digits.find('1')
+    while i >= 0:
+        yield i
+        i = digits.find('1', i + 1)
+
+def mask_of(numbers, size):
+    """Return the mask with the given bits set, all less than size."""
+    if len(numbers) * 32 < size:
+        mask = 0
+        for i in numbers:
+            mask |= 1 << i
+        return mask
+    # Setting many bits one at a time copies the mask each time, so build
+    # it as a string of binary digits instead, highest first.
+    digits = ['0'] * size
+    for i in numbers:
+        digits[size - 1 - i] = '1'
+    return int(''.join(digits) or '0', 2)
+
+class CandidateSets(object):
+    """Class CandidateSets
+       The possible recipients of each giver in an exchange, for searching.
+       Participants are numbered in name list order, and each giver's
+       possible recipients are an integer with a bit set for each one
+       (rows).  Each recipient's possible givers are kept the same way
+       (cols), along with how many there are of each (sizes).
+
+       assign() and eliminate() propagate the constraints as
+       GiftExchange's methods of the same names do, and record what they
+       remove on the trail, as a mask for each set they shrink.  undo()
+       puts the removals back in reverse order, so a failed guess costs
+       only what it removed, rather than a copy of every list.
+
+        Class Methods:
+            __init__(self, namelist, recips):
+                Make the candidate sets for a name list and a dictionary
+                of each giver's possible recipients.
+            eliminate(self, giver, recip):
+                Remove a possible recipient and propagate.  Returns False
+                if there is a contradiction.
+            assign(self, giver, recip):
+                Remove all the giver's other possible recipients and
+                propagate.  Returns False if there is a contradiction.
+            undo(self, mark):
+                Put back everything removed since the trail was mark long.
+            search(self, verbose):
+                Search for an exchange.  Returns True if one is found.
+            exchange(self):
+                Return the dictionary of givers to recipients found."""
+
+    def __init__(self, namelist, recips):
+        self.namelist = list(namelist)
+        index = dict((name, i) for (i, name) in enumerate(self.namelist))
+        n = len(self.namelist)
+        # Build the masks as strings of binary digits, highest bit first.
+        row_digits = [['0'] * n for _ in range(n)]
+        col_digits = [['0'] * n for _ in range(n)]
+        for (g, giver) in enumerate(self.namelist):
+            for recip in recips[giver]:
+                r = index[recip]
+                row_digits[g][n - 1 - r] = '1'
+                col_digits[r][n - 1 - g] = '1'
+        rows = [int(''.join(digits) or '0', 2) for digits in row_digits]
+        cols = [int(''.join(digits) or '0', 2) for digits in col_digits]
+        row_sizes = [digits.count('1') for digits in row_digits]
+        col_sizes = [digits.count('1') for digits in col_digits]
+        self.rows, self.cols = rows, cols
+        # Indexed by side: 0 for givers' recipients, 1 for recipients' givers.
+        self.sets = (rows, cols)
+        self.sizes = (row_sizes, col_sizes)
+        # Entries are (side, number, mask): the bits removed from one set.
+        self.trail = []
+
+    def drop(self, side, i, mask, forced):
+        """Remove the bits of mask from set i of side (and i from the sets
+           of the other side they stand for), and record it on the trail.
+           Sets left with one member are added to the forced list.  Returns
+           False if any set is left empty."""
+        mine, other = self.sets[side], self.sets[1 - side]
+        my_sizes, other_sizes = self.sizes[side], self.sizes[1 - side]
+        self.trail.append((side, i, mask))
+        mine[i] ^= mask
+        i_bit = 1 << i
+        okay = True
+        # As bits(mask), without a generator, as this is the inner loop.
+        digits = bin(mask)[:1:-1]
+        j = digits.find('1')
+        while j >= 0:
+            other[j] ^= i_bit
+            other_sizes[j] -= 1
+            if other_sizes[j] == 1:
+                forced.append((1 - side, j))
+            elif other_sizes[j] == 0:
+                okay = False
+            j = digits.find('1', j + 1)
+        my_sizes[i] -= digits.count('1')
+        if my_sizes[i] == 1:
+            forced.append((side, i))
+        elif my_sizes[i] == 0:
+            okay = False
+        return okay
+
+    def propagate(self, forced):
+        """For each set in the forced list that has one member left, remove
+           everyone else from that member's set, and so on until nothing
+           more is forced.  Returns False if there is a contradiction."""
+        while forced:
+            side, i = forced.pop()
+            j = self.sets[side][i].bit_length() - 1
+            others = self.sets[1 - side][j] & ~(1 << i)
+            if others and not self.drop(1 - side, j, others, forced):
+                return False
+        return True
+
+    def eliminate(self, giver, recip):
+        forced = []
+        if not self.rows[giver] & (1 << recip):
+            return True
+        return self.drop(0, giver, 1 << recip, forced) and self.propagate(forced)
+
+    def assign(self, giver, recip):
+        forced = []
+        others = self.rows[giver] & ~(1 << recip)
+        if others and not self.drop(0, giver, others, forced):
+            return False
+        return self.propagate(forced)
+
+    def undo(self, mark):
+        trail = self.trail
+        while len(trail) > mark:
+            side, i, mask = trail.pop()
+            mine, other = self.sets[side], self.sets[1 - side]
+            other_sizes = self.sizes[1 - side]
+            mine[i] |= mask
+            i_bit = 1 << i
+            j_list = list(bits(mask))
+            for j in j_list:
+                other[j] |= i_bit
+                other_sizes[j] += 1
+            self.sizes[side][i] += len(j_list)
+
+    def search(self, verbose=False):
+        """Search for an exchange: guess a recipient for one of the givers
+           with the fewest possible recipients, propagate, and repeat,
+           undoing a guess that fails and trying the giver's next
+           recipient.  Returns True if every giver is left with exactly
+           one recipient."""
+        row_sizes, col_sizes = self.sizes
+        if 0 in row_sizes or 0 in col_sizes:
+            return False
+        # Settle anyone who is already down to one.
+        forced = [(side, i) for side in (0, 1)
+                  for (i, size) in enumerate(self.sizes[side]) if size == 1]
+        if not self.propagate(forced):
+            return False
+
+        # Each guess is (giver, recipients not yet tried, trail mark).
+        guesses = []
+        while True:
+            open_givers = [(size, g) for (g, size) in enumerate(row_sizes) if size > 1]
+            if not open_givers:
+                return True
+            size, g = min(open_givers)
+            guesses.append((g, list(bits(self.rows[g])), len(self.trail)))
+            while guesses:
+                g, rlist, mark = guesses[-1]
+                self.undo(mark)
+                if not rlist:
+                    guesses.pop()
+                    continue
+                # Take a random recipient not yet tried (the first guess
+                # usually works, so don't shuffle them all).
+                k = random.randrange(len(rlist))
+                rlist[k], rlist[-1] = rlist[-1], rlist[k]
+                r = rlist.pop()
+                if verbose:
+                    print "  Trying %s gives to %s" % (self.namelist[g], self.namelist[r])
+                if self.assign(g, r):
+                    break
+            else:
+                return False
+
+    def exchange(self):
+        return dict((giver, self.namelist[self.rows[g].bit_length() - 1])
+                    for (g, giver) in enumerate(self.namelist))
+
 if __name__ == "__main__":
     # Edit this list to set the participants in the exchange.
     family_list = [["Alia", "Tanya"],
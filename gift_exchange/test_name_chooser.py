@@ -0,0 +1,228 @@
+#! /usr/bin/python
+
+# vim: set ai sw=4 et:
+
+"""Test cases for name_chooser.py.
+
+The exchanges here are small enough to list every exchange they allow, by
+trying each permutation of the participants, so each way of making an
+exchange is checked against that list: it has to find an exchange exactly
+when there is one, and the one it finds has to be on the list.
+"""
+
+import random
+import itertools
+import unittest
+import name_chooser
+
+# Random exchanges have up to MAX_PEOPLE participants, in families of 1 to
+# MAX_FAMILY, with each other pair excluded with chance EXCLUDE_CHANCE.
+MAX_PEOPLE = 7
+MAX_FAMILY = 3
+EXCLUDE_CHANCE = 0.2
+TRIALS = 300
+
+def random_families(rng):
+    """Return a list of random families of p0, p1, ..."""
+    size = rng.randint(2, MAX_PEOPLE)
+    families = []
+    count = 0
+    while count < size:
+        family_size = min(rng.randint(1, MAX_FAMILY), size - count)
+        families.append(['p%d' % i for i in range(count, count + family_size)])
+        count += family_size
+    return families
+
+def random_excluded(rng, families):
+    """Return a random set of (giver, recipient) pairs to exclude."""
+    names = [name for family in families for name in family]
+    return set((giver, recip) for giver in names for recip in names
+               if giver != recip and rng.random() < EXCLUDE_CHANCE)
+
+def random_cases(seed, exclude=True):
+    """Generate (families, excluded pairs) of TRIALS random exchanges."""
+    rng = random.Random(seed)
+    for _ in range(TRIALS):
+        families = random_families(rng)
+        yield families, random_excluded(rng, families) if exclude else set()
+
+def make_exchange(families, excluded=()):
+    """Return a reset GiftExchange of the families, less the excluded pairs."""
+    ge = name_chooser.GiftExchange(quiet=True)
+    for family in families:
+        ge.add_family(family)
+    ge.exclude_pairs(excluded)
+    ge.reset_exchange()
+    return ge
+
+def all_exchanges(families, excluded=()):
+    """Return every exchange the families and excluded pairs allow, each as
+    a tuple of the recipients of the participants in order."""
+    family = dict((name, f) for (f, names) in enumerate(families) for name in names)
+    names = [name for names in families for name in names]
+    return set(recips for recips in itertools.permutations(names)
+               if all(family[giver] != family[recip] and (giver, recip) not in excluded
+                      for (giver, recip) in zip(names, recips)))
+
+def found_exchange(ge):
+    """Return the exchange left in ge.recips, as all_exchanges() gives them."""
+    assert all(len(ge.recips[giver]) == 1 for giver in ge.namelist)
+    return tuple(ge.recips[giver][0] for giver in ge.namelist)
+
+class TestExchange(unittest.TestCase):
+    """Tests for finding a whole exchange"""
+
+    def check_search(self, search, exclude=True):
+        """Check that search(ge) finds an exchange just when there is one."""
+        for (trial, (families, excluded)) in enumerate(random_cases(1, exclude)):
+            expected = all_exchanges(families, excluded)
+            ge = make_exchange(families, excluded)
+            random.seed(trial)
+            found = search(ge)
+            self.assertEqual(found, bool(expected), (families, excluded))
+            if found:
+                self.assertIn(found_exchange(ge), expected, (families, excluded))
+
+    def test_generate_exchange(self):
+        """generate_exchange() agrees with brute force"""
+        self.check_search(lambda ge: ge.generate_exchange())
+
+    def test_generate_exchange_copies(self):
+        """generate_exchange(trail=False) agrees with brute force"""
+        self.check_search(lambda ge: ge.generate_exchange(trail=False))
+
+    def test_generate_matching(self):
+        """generate_matching() agrees with brute force"""
+        self.check_search(lambda ge: ge.generate_matching())
+
+    def test_candidate_sets(self):
+        """CandidateSets.search() agrees with brute force"""
+        def search(ge):
+            candidates = name_chooser.CandidateSets(ge.namelist, ge.recips)
+            if not candidates.search():
+                return False
+            exchange = candidates.exchange()
+            for giver in ge.namelist:
+                ge.recips[giver] = [exchange[giver]]
+            return True
+        self.check_search(search)
+
+    def test_assign_eliminate(self):
+        """Exchanges found after assign() and eliminate() keep to them"""
+        rng = random.Random(2)
+        for (families, excluded) in random_cases(3):
+            names = [name for family in families for name in family]
+            giver, recip = rng.choice(names), rng.choice(names)
+            other_giver, other_recip = rng.choice(names), rng.choice(names)
+            expected = set(recips for recips in all_exchanges(families, excluded)
+                           if recips[names.index(giver)] == recip and
+                           recips[names.index(other_giver)] != other_recip)
+            for trail in (True, False):
+                ge = make_exchange(families, excluded)
+                if not (recip in ge.recips[giver] and ge.assign(giver, recip) and
+                        ge.eliminate(other_giver, other_recip)):
+                    self.assertEqual(expected, set())
+                    continue
+                found = ge.generate_exchange(trail=trail)
+                self.assertEqual(found, bool(expected), (families, excluded))
+                if found:
+                    self.assertIn(found_exchange(ge), expected)
+
+    def test_every_exchange(self):
+        """Every exchange allowed can be found"""
+        families = [['a', 'b'], ['c'], ['d'], ['e']]
+        expected = all_exchanges(families, set([('c', 'd')]))
+        for search in (lambda ge: ge.generate_exchange(),
+                       lambda ge: ge.generate_exchange(trail=False),
+                       lambda ge: ge.generate_matching()):
+            seen = set()
+            for seed in range(50 * len(expected)):
+                random.seed(seed)
+                ge = make_exchange(families, set([('c', 'd')]))
+                self.assertTrue(search(ge))
+                seen.add(found_exchange(ge))
+            self.assertEqual(seen, expected)
+
+class TestPairing(unittest.TestCase):
+    """Tests for generate_pairing(), which only keeps families apart"""
+
+    def test_generate_pairing(self):
+        """generate_pairing() agrees with brute force"""
+        for (trial, (families, _)) in enumerate(random_cases(4, exclude=False)):
+            expected = all_exchanges(families)
+            for sample in (False, True):
+                ge = make_exchange(families)
+                random.seed(trial)
+                self.assertEqual(ge.generate_pairing(sample=sample), bool(expected),
+                                 families)
+                if expected:
+                    self.assertEqual([giver for (giver, _) in ge.pairing], ge.namelist)
+                    self.assertIn(tuple(recip for (_, recip) in ge.pairing), expected)
+
+    def test_sample_pairing(self):
+        """sample_pairing() only gives possible pairings"""
+        for (trial, (families, _)) in enumerate(random_cases(5, exclude=False)):
+            expected = all_exchanges(families)
+            if not expected:
+                continue
+            random.seed(trial)
+            pairing, tries = make_exchange(families).sample_pairing()
+            self.assertIn(tuple(recip for (_, recip) in pairing), expected)
+
+class TestBatch(unittest.TestCase):
+    """Tests for generate_batch()"""
+
+    def check_batch(self, families, excluded, exchanges, distinct):
+        """Check a batch against brute force (excluding, if distinct, the
+        pairs of the exchanges before each one)."""
+        names = [name for family in families for name in family]
+        excluded = set(excluded)
+        for exchange in exchanges:
+            expected = all_exchanges(families, excluded)
+            self.assertEqual(exchange is not None, bool(expected), (families, excluded))
+            if exchange is not None:
+                self.assertIn(tuple(exchange[giver] for giver in names), expected)
+                if distinct:
+                    excluded.update(exchange.items())
+
+    def test_batch(self):
+        """Batches of exchanges agree with brute force"""
+        for (trial, (families, excluded)) in enumerate(random_cases(6)):
+            if trial % 10:
+                continue
+            ge = make_exchange(families, excluded)
+            for method in ('generate_exchange', 'generate_matching'):
+                self.check_batch(families, excluded,
+                                 ge.generate_batch(3, seed=trial, processes=1,
+                                                   method=method), False)
+                self.check_batch(families, excluded,
+                                 ge.generate_batch(4, seed=trial, distinct=True,
+                                                   method=method), True)
+
+    def test_seed(self):
+        """The same seed makes the same batch, in parallel or not"""
+        families = [['a', 'b'], ['c', 'd'], ['e'], ['f', 'g']]
+        ge = make_exchange(families, set([('a', 'c'), ('e', 'f')]))
+        batch = ge.generate_batch(6, seed=7, processes=1)
+        self.check_batch(families, ge.excluded_pairs, batch, False)
+        self.assertEqual(ge.generate_batch(6, seed=7, processes=2), batch)
+        self.assertNotEqual(ge.generate_batch(6, seed=8, processes=1), batch)
+
+    def test_random_state(self):
+        """Making a batch here leaves the caller's random state alone"""
+        ge = make_exchange([['a', 'b'], ['c'], ['d', 'e']])
+        random.seed(3)
+        state = random.getstate()
+        ge.generate_batch(3, seed=1, processes=1)
+        ge.generate_batch(3, seed=1, distinct=True)
+        ge.generate_batch(1, seed=1)
+        self.assertEqual(random.getstate(), state)
+
+    def test_methods(self):
+        """Batches are only made with methods that give whole exchanges"""
+        ge = make_exchange([['a', 'b'], ['c'], ['d', 'e']])
+        for method in ('generate_pairing', 'reset_exchange', 'no_such_method'):
+            self.assertRaises(ValueError, ge.generate_batch, 2, method=method)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#! /usr/bin/env python3
+"""An index of the anagram groups in a word warp data file.
+
+Each good line of a data file is a group of words that are anagrams of each
+other.  The index maps the signature of a group (its letters, casefolded
+and sorted) to the words on the line, so finding the words that can be made
+from a set of letters is a single dictionary lookup instead of a scan of
+the file.
+
+Functions:
+    signature(): Returns the anagram signature of a word or set of letters.
+    load_index(): Loads an index saved by AnagramIndex.save().
+
+Classes:
+    AnagramIndex: The index itself, built from data files or loaded from
+        its saved form.
+
+When invoked as a command-line program, the index is built from a data file
+(or loaded from a saved index) and each rack of letters given on the
+command line is looked up in it.
+"""
+
+import sys
+import argparse
+import itertools
+import pickle
+import process_data as pd
+
+# Bump this when the saved form of the index changes.
+INDEX_VERSION = 1
+
+# The signature of a word or set of letters: its casefolded, sorted letters.
+signature = pd.signature
+
+class AnagramIndex(object):
+    """Anagram groups of word warp data, keyed by signature."""
+
+    def __init__(self):
+        self.groups = {}
+        # The lengths of the signatures in groups.
+        self.lengths = set()
+
+    def __len__(self):
+        return len(self.groups)
+
+    def add_line(self, line):
+        """Add the words of a (good) data line to the index."""
+        word_list = pd.get_words(line)
+        self.add_words(word_list)
+
+    def add_words(self, word_list):
+        """Add a list of words which are anagrams of each other."""
+        word_signature = signature(word_list[0])
+        self.lengths.add(len(word_signature))
+        group = self.groups.setdefault(word_signature, [])
+        for word in word_list:
+            if word not in group:
+                group.append(word)
+        group.sort(key=str.casefold)
+
+    def add_file(self, filename):
+        """Add the good lines of a data file to the index.
+
+        Lines are classified as in process_data.py: skipped lines are
+        ignored, bad lines are left out, and the file ends at an end line.
+        """
+        with open(filename) as data_file:
+            for line in data_file:
+                verdict = pd.classify_line(line.rstrip('\n'), False)
+                if verdict.kind == pd.END:
+                    break
+                if verdict.kind == pd.GOOD:
+                    self.add_words(verdict.words)
+
+    def lookup(self, letters):
+        """Return the words that are anagrams of letters ([] if none)."""
+        return self.groups.get(signature(letters), [])
+
+    def sub_anagrams(self, letters, min_length=1):
+        """Return the words that can be made from some of the letters.
+
+        Each distinct sub-multiset of the letters is looked up once, so a
+        query costs at most 2**len(letters) lookups, however big the index.
+        Lengths that no word in the index has are skipped.
+        Words are returned longest first, then alphabetically.
+        """
+        letters = signature(letters)
+        words = []
+        for length in range(len(letters), min_length - 1, -1):
+            if length not in self.lengths:
+                continue
+            for sub_letters in sorted(set(itertools.combinations(letters, length))):
+                words.extend(self.groups.get(''.join(sub_letters), []))
+        return words
+
+    def save(self, filename):
+        """Save the index in a form that load_index() reads quickly."""
+        with open(filename, 'wb') as index_file:
+            pickle.dump((INDEX_VERSION, self.groups), index_file,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+
+def load_index(filename):
+    """Load an index saved by AnagramIndex.save()."""
+    with open(filename, 'rb') as index_file:
+        version, groups = pickle.load(index_file)
+    if version != INDEX_VERSION:
+        raise ValueError('{}: index version {}, expected {}'.format(
+            filename, version, INDEX_VERSION))
+    index = AnagramIndex()
+    index.groups = groups
+    index.lengths = {len(group_signature) for group_signature in groups}
+    return index
+
+def parse_args(args):
+    """Parse command line arguments to the program."""
+    parser = argparse.ArgumentParser(description='Look up anagrams in word warp data')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--files', '-f', nargs='+',
+                        help='Data files to build the index from.')
+    source.add_argument('--index', '-x',
+                        help='Saved index to load.')
+    parser.add_argument('--save', '-o',
+                        help='Save the index to this file.')
+    parser.add_argument('--sub', '-s', action='store_true',
+                        help='Also show words made from some of the letters.')
+    parser.add_argument('racks', nargs='*',
+                        help='Sets of letters to look up.')
+    return parser.parse_args(args)
+
+def main(args):
+    if args.index:
+        index = load_index(args.index)
+    else:
+        index = AnagramIndex()
+        for filename in args.files:
+            index.add_file(filename)
+    if args.save:
+        index.save(args.save)
+
+    for rack in args.racks:
+        if args.sub:
+            words = index.sub_anagrams(rack)
+        else:
+            words = index.lookup(rack)
+        print('{}: {}'.format(rack, ', '.join(words)))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,427 @@
+#! /usr/bin/env python3
+"""Micro-benchmarks for the word warp data processing code.
+
+Times the per-line classification over every line of the files in
+data/, comparing the original way of checking a line (regular expressions
+given as strings on each line, the line split into words three times) with
+process_data.classify_line().  Reports lines per second for each.
+
+With --synthetic N, instead writes a file of N good lines and compares
+reading it line by line as text (check_file()) with reading it through mmap
+as bytes (check_mapped_file()), reporting lines per second and the peak
+memory allocated by each.
+
+With --suite N, runs the benchmark suite on a synthetic file of N lines,
+with --unicode, --anagrams and --bad setting the fractions of lines with
+non-ASCII letters, with more than one word, and with something wrong.  The
+line checks (get_words(), line_space_okay(), words_okay(),
+words_are_anagrams(), line_is_good() and the check_line_words() of the
+compiled word warp rules) are timed on the first --micro_lines lines, and
+process_files() is timed end to end on the whole file, reading it as text
+and through mmap.  Lines per second and the peak memory allocated by
+process_files() are compared with a baseline stored in
+benchmark_baseline.json (written by --save_baseline), and the program exits
+with status 1 if any of them is more than --tolerance worse.  The baseline
+is only checked by runs with the settings it was saved with; the one kept
+in the repository is for --suite 100000 with the default mix.
+"""
+
+import sys
+import os
+import re
+import glob
+import time
+import argparse
+import itertools
+import json
+import random
+import string
+import tempfile
+import tracemalloc
+import contextlib
+import functools
+import process_data as pd
+import rules
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'benchmark_baseline.json')
+
+# Letters for synthetic words, in code point order so that words made from
+# them in order are sorted.  The accented letters sort after the ASCII ones,
+# and their capitals are all single 'Lu' code points.
+ASCII_LETTERS = string.ascii_lowercase
+UNICODE_LETTERS = ASCII_LETTERS + 'àéîñöü'
+
+def legacy_classify(line, debug):
+    """Classify a line the way process_files() originally did."""
+    SKIP_RE = r'^$|^#|^[Ww]ord[  ]*[Ww]arp|^Score:|^Rounds:'
+    if re.search(SKIP_RE, line):
+        return pd.SKIP
+    END_RE = '^(-{3})|—{3}'
+    if re.search(END_RE, line):
+        return pd.END
+    if not pd.line_space_okay(line, debug):
+        return pd.BAD
+    if not legacy_words_okay(pd.get_words(line), debug):
+        return pd.BAD
+    word_list = [word.casefold() for word in pd.get_words(line)]
+    if not pd.words_are_anagrams(word_list, debug):
+        return pd.BAD
+    if not pd.words_are_alphabetic(word_list, debug):
+        return pd.BAD
+    return pd.GOOD
+
+def legacy_words_okay(word_list, debug):
+    """Check words the way words_okay() originally did."""
+    return all(rules.categories(word) == 'Lu' + 'Ll'*5 for word in word_list)
+
+def current_classify(line, debug):
+    """Classify a line with process_data.classify_line()."""
+    return pd.classify_line(line, debug).kind
+
+def read_lines(files):
+    """Return all the lines of the given files, without newlines."""
+    lines = []
+    for filename in files:
+        with open(filename) as data_file:
+            lines.extend(line.rstrip('\n') for line in data_file)
+    return lines
+
+def time_classifier(classify, lines, repeat):
+    """Return the best lines per second of classify() over lines.
+
+    (classify() is called with a line and a debug flag, so this times
+    anything with that signature, such as words_okay() on word lists.)
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            classify(line, False)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return len(lines) / best
+
+def synthetic_words(letters):
+    """Generator which returns capitalized 6-letter words, in order."""
+    capitals = [letter.upper() for letter in letters]
+    for word in itertools.product(capitals, *[letters] * 5):
+        yield ''.join(word)
+
+def anagram_line(word, rng):
+    """Return a good line of word and up to 2 later anagrams of it."""
+    letters = list(word.casefold())
+    folded = set()
+    for _ in range(rng.randint(1, 2)):
+        rng.shuffle(letters)
+        anagram = ''.join(letters)
+        if anagram > word.casefold():
+            folded.add(anagram)
+    return ', '.join([word] + [anagram.capitalize() for anagram in sorted(folded)])
+
+def bad_line(word, last_line, rng):
+    """Return a line made from word with one of the things that can be wrong."""
+    kind = rng.randrange(6)
+    if kind == 0:
+        return word.lower()
+    if kind == 1:
+        return word[:5]
+    if kind == 2:
+        return word + ',' + word[::-1].capitalize()
+    if kind == 3:
+        return word + ', ' + word[:5] + ('b' if word.endswith('a') else 'a')
+    if kind == 4:
+        later = ''.join(sorted(word.casefold(), reverse=True))
+        if later > word.casefold():
+            return later.capitalize() + ', ' + word
+    return last_line or word.lower()
+
+def synthetic_lines(num_lines, unicode=0.0, anagrams=0.0, bad=0.0, seed=0):
+    """Generator which returns num_lines lines of synthetic word warp data.
+
+    The good lines are in order.  About unicode of them have non-ASCII
+    letters and anagrams of them have more than one word; about bad of all
+    the lines are bad.  The same arguments always give the same lines.
+    """
+    rng = random.Random(seed)
+    letters = UNICODE_LETTERS if unicode else ASCII_LETTERS
+    words = synthetic_words(letters)
+    last_line = ''
+    for _ in range(num_lines):
+        want_unicode = rng.random() < unicode
+        for word in words:
+            if word.isascii() != want_unicode:
+                break
+        if rng.random() < bad:
+            yield bad_line(word, last_line, rng)
+        elif rng.random() < anagrams:
+            last_line = anagram_line(word, rng)
+            yield last_line
+        else:
+            last_line = word
+            yield last_line
+
+def write_synthetic_file(filename, num_lines, **mix):
+    """Write a data file of num_lines synthetic_lines().
+
+    With no mix keywords, the lines are all good, single-word ASCII lines.
+    """
+    with open(filename, 'w') as data_file:
+        data_file.write('Word warp\n\n')
+        for line in synthetic_lines(num_lines, **mix):
+            data_file.write(line + '\n')
+
+def time_checker(checker, filename, num_lines):
+    """Return the lines per second for checking filename."""
+    args = pd.parse_args(['-f', filename])
+    start = time.perf_counter()
+    succeeded, stats = checker(filename, args, lambda record: None)
+    elapsed = time.perf_counter() - start
+    assert succeeded, 'Synthetic file did not check out'
+    return num_lines / elapsed
+
+def trace_checker(checker, filename):
+    """Return the peak bytes allocated while checking filename.
+
+    Tracing allocations is slow, so this is a separate run from the timing.
+    """
+    args = pd.parse_args(['-f', filename])
+    tracemalloc.start()
+    checker(filename, args, lambda record: None)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def compare_readers(num_lines, trace_memory):
+    """Compare check_file() and check_mapped_file() on a synthetic file."""
+    tmp_dir = tempfile.mkdtemp()
+    filename = os.path.join(tmp_dir, 'ww_data.synthetic')
+    try:
+        write_synthetic_file(filename, num_lines)
+        print('Checking {:,} synthetic lines ({:,} bytes)'.format(
+            num_lines, os.path.getsize(filename)))
+        for name, checker in (('text', pd.check_file),
+                              ('mmap', pd.check_mapped_file)):
+            rate = time_checker(checker, filename, num_lines)
+            print('  {}: {:12,.0f} lines/sec'.format(name, rate))
+            if trace_memory:
+                peak = trace_checker(checker, filename)
+                print('        peak {:,} bytes allocated'.format(peak))
+    finally:
+        os.remove(filename)
+        os.rmdir(tmp_dir)
+
+def time_items(function, items, repeat):
+    """Return the best items per second of function() called on each item."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            function(item)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return len(items) / best
+
+def line_benchmarks(lines):
+    """Return (name, function, items) for each of the timed line checks.
+
+    Each check gets the input it gets in check_line_words(): words_okay()
+    gets the words of every line, and words_are_anagrams() the casefolded
+    words of the lines that pass words_okay().
+    """
+    word_lists = [pd.get_words(line) for line in lines]
+    folded_lists = [[word.casefold() for word in word_list]
+                    for word_list in word_lists if pd.words_okay(word_list, False)]
+    return [
+        ('get_words', pd.get_words, lines),
+        ('line_space_okay', functools.partial(pd.line_space_okay, debug=False), lines),
+        ('words_okay', functools.partial(pd.words_okay, debug=False), word_lists),
+        ('words_are_anagrams', functools.partial(pd.words_are_anagrams, debug=False),
+         folded_lists),
+        ('line_is_good', functools.partial(pd.line_is_good, debug=False), lines),
+        ('compiled_rules',
+         functools.partial(rules.get_rules().check_line_words, debug=False), lines),
+    ]
+
+def run_process_files(arg_list):
+    """Run process_files() with its output thrown away (and no cache)."""
+    args = pd.parse_args(['--no-cache'] + arg_list)
+    with open(os.devnull, 'w') as devnull:
+        with contextlib.redirect_stdout(devnull):
+            pd.process_files(args)
+
+def time_process_files(arg_list, num_lines, repeat):
+    """Return the best lines per second of process_files() on arg_list."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run_process_files(arg_list)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return num_lines / best
+
+def trace_process_files(arg_list):
+    """Return the peak bytes allocated by process_files() on arg_list."""
+    tracemalloc.start()
+    run_process_files(arg_list)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+def suite_settings(args):
+    """Return the settings of a suite run, which a baseline has to match."""
+    return {'lines': args.suite, 'micro_lines': min(args.micro_lines, args.suite),
+            'unicode': args.unicode, 'anagrams': args.anagrams, 'bad': args.bad,
+            'seed': args.seed}
+
+def run_suite(args):
+    """Run the benchmark suite; return {name: {measure: value}}."""
+    results = {}
+    mix = {'unicode': args.unicode, 'anagrams': args.anagrams, 'bad': args.bad,
+           'seed': args.seed}
+    lines = list(itertools.islice(synthetic_lines(args.suite, **mix), args.micro_lines))
+    print('Timing line checks on {:,} lines'.format(len(lines)))
+    for name, function, items in line_benchmarks(lines):
+        rate = time_items(function, items, args.repeat)
+        results[name] = {'lines_per_sec': rate}
+        print('  {:20} {:12,.0f} lines/sec'.format(name + ':', rate))
+    del lines
+
+    tmp_dir = tempfile.mkdtemp()
+    filename = os.path.join(tmp_dir, 'ww_data.synthetic')
+    try:
+        write_synthetic_file(filename, args.suite, **mix)
+        print('Timing process_files() on {:,} lines ({:,} bytes)'.format(
+            args.suite, os.path.getsize(filename)))
+        for name, arg_list in (('process_files', ['-f', filename]),
+                               ('process_files_mmap', ['-m', '-f', filename])):
+            rate = time_process_files(arg_list, args.suite, args.repeat)
+            peak = trace_process_files(arg_list)
+            results[name] = {'lines_per_sec': rate, 'peak_bytes': peak}
+            print('  {:20} {:12,.0f} lines/sec, peak {:,} bytes allocated'.format(
+                name + ':', rate, peak))
+    finally:
+        os.remove(filename)
+        os.rmdir(tmp_dir)
+    return results
+
+def find_regressions(results, baseline, tolerance):
+    """Return messages for each result more than tolerance worse than baseline.
+
+    Lines per second regress by going down, peak bytes by going up.
+    """
+    messages = []
+    for name, measures in sorted(results.items()):
+        for measure, value in sorted(measures.items()):
+            base = baseline.get(name, {}).get(measure)
+            if base is None:
+                continue
+            if measure == 'peak_bytes':
+                worse = value > base * (1 + tolerance)
+            else:
+                worse = value < base * (1 - tolerance)
+            if worse:
+                messages.append('{} {}: {:,.0f}, baseline {:,.0f}'.format(
+                    name, measure, value, base))
+    return messages
+
+def check_baseline(args, results):
+    """Save or check the suite results against the baseline file.
+
+    Returns the program's exit status.
+    """
+    settings = suite_settings(args)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as baseline_file:
+            json.dump({'settings': settings, 'results': results}, baseline_file,
+                      indent=2, sort_keys=True)
+            baseline_file.write('\n')
+        print('Saved baseline to "{}"'.format(args.baseline))
+        return 0
+    if not os.path.exists(args.baseline):
+        print('No baseline "{}" to check against'.format(args.baseline))
+        return 0
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+    if baseline['settings'] != settings:
+        print('Baseline "{}" is for other settings; not checked'.format(args.baseline))
+        return 0
+    messages = find_regressions(results, baseline['results'], args.tolerance)
+    for message in messages:
+        print('Regression: ' + message)
+    if messages:
+        return 1
+    print('No regressions against "{}"'.format(args.baseline))
+    return 0
+
+def parse_args(args):
+    """Parse command line arguments to the program."""
+    parser = argparse.ArgumentParser(description='Benchmark word warp processing')
+    parser.add_argument('--files', '-f', nargs='+',
+                        default=sorted(glob.glob(os.path.join(DATA_DIR, '*'))))
+    parser.add_argument('--repeat', '-r', type=int, default=5,
+                        help='Number of timing runs; the best one is reported.')
+    parser.add_argument('--synthetic', '-n', type=int,
+                        help='Compare file readers on a file of this many lines.')
+    parser.add_argument('--trace_memory', '-m', action='store_true',
+                        help='With --synthetic, also report peak memory allocated.')
+    parser.add_argument('--suite', '-s', type=int, metavar='LINES',
+                        help='Run the benchmark suite on this many synthetic lines.')
+    parser.add_argument('--micro_lines', type=int, default=100000,
+                        help='Most lines to time the line checks on.')
+    parser.add_argument('--unicode', type=float, default=0.1,
+                        help='Fraction of suite lines with non-ASCII letters.')
+    parser.add_argument('--anagrams', type=float, default=0.2,
+                        help='Fraction of suite lines with more than one word.')
+    parser.add_argument('--bad', type=float, default=0.01,
+                        help='Fraction of suite lines that are bad.')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='Random seed for the suite lines.')
+    parser.add_argument('--baseline', default=BASELINE_FILE,
+                        help='Baseline file to check the suite against.')
+    parser.add_argument('--save_baseline', action='store_true',
+                        help='Save the suite results as the baseline.')
+    parser.add_argument('--tolerance', type=float, default=0.3,
+                        help='Fraction worse than the baseline that counts as '
+                             'a regression.')
+    return parser.parse_args(args)
+
+def main(args):
+    if args.suite:
+        return check_baseline(args, run_suite(args))
+
+    if args.synthetic:
+        compare_readers(args.synthetic, args.trace_memory)
+        return 0
+
+    lines = read_lines(args.files)
+    before = [legacy_classify(line, False) for line in lines]
+    after = [current_classify(line, False) for line in lines]
+    assert before == after, 'Classifiers disagree'
+
+    print('Classifying {} lines from {} files'.format(len(lines), len(args.files)))
+    before = time_classifier(legacy_classify, lines, args.repeat)
+    after = time_classifier(current_classify, lines, args.repeat)
+    print('  before: {:12,.0f} lines/sec'.format(before))
+    print('  after:  {:12,.0f} lines/sec'.format(after))
+    print('  speedup: {:.2f}x'.format(after / before))
+
+    word_lists = [pd.get_words(line) for line in lines]
+    before = [legacy_words_okay(word_list, False) for word_list in word_lists]
+    after = [pd.words_okay(word_list, False) for word_list in word_lists]
+    assert before == after, 'words_okay() disagrees'
+
+    print('Checking words of {} lines'.format(len(word_lists)))
+    before = time_classifier(legacy_words_okay, word_lists, args.repeat)
+    after = time_classifier(pd.words_okay, word_lists, args.repeat)
+    print('  before: {:12,.0f} lines/sec'.format(before))
+    print('  after:  {:12,.0f} lines/sec'.format(after))
+    print('  speedup: {:.2f}x'.format(after / before))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,165 @@
+#! /usr/bin/env python3
+"""Turn raw word warp game transcripts into a clean data file.
+
+A raw transcript has the words found in each game, in any order, with
+"Word warp" headers and other lines mixed in.  A clean data file (one that
+process_data.py accepts) has one line per anagram group, the words of each
+line in alphabetical order, and the lines in order.
+
+The words are put in order with an external merge sort, so the transcripts
+can be much larger than memory: at most --buffer_lines items are held in
+memory at once, and sorted runs of that many items are written to temporary
+files and merged.  There are two sorts.  The first sorts the words by
+signature, which brings each anagram group together with its words in
+order.  The second sorts the resulting lines.
+
+Functions:
+    external_sort(): Sorts strings with bounded memory.
+    transcript_words(): Returns the words of raw transcripts.
+    normalize(): Returns the lines of a clean data file made from raw
+        transcripts.
+"""
+
+import sys
+import argparse
+import heapq
+import itertools
+import os
+import tempfile
+import process_data as pd
+
+DEFAULT_BUFFER_LINES = 100000
+
+def write_run(items, tmp_dir):
+    """Write sorted items to a new temporary file; return its name."""
+    fd, run_name = tempfile.mkstemp(dir=tmp_dir, suffix='.run')
+    with open(fd, 'w') as run_file:
+        for item in items:
+            run_file.write(item + '\n')
+    return run_name
+
+def read_run(run_name):
+    """Generator which returns the items of a run file."""
+    with open(run_name) as run_file:
+        for item in run_file:
+            yield item[:-1]
+
+def external_sort(items, buffer_lines, tmp_dir):
+    """Generator which returns the strings in items in sorted order.
+
+    The strings must not contain newlines.  At most buffer_lines of them
+    are held in memory; if there are more, they are sorted in runs of that
+    size in tmp_dir, and the runs merged.
+    """
+    run_names = []
+    while True:
+        chunk = list(itertools.islice(items, buffer_lines))
+        if len(chunk) < buffer_lines and not run_names:
+            # Everything fit in memory.
+            chunk.sort()
+            yield from chunk
+            return
+        if not chunk:
+            break
+        chunk.sort()
+        run_names.append(write_run(chunk, tmp_dir))
+        del chunk
+    try:
+        yield from heapq.merge(*[read_run(run_name) for run_name in run_names])
+    finally:
+        for run_name in run_names:
+            os.remove(run_name)
+
+def transcript_words(filenames, report):
+    """Generator which returns the words of raw transcript files.
+
+    Lines are read as process_data.py reads them: skipped lines are
+    ignored and a file ends at an end line.  Words which are not
+    capitalized 6-letter words are passed to report() as 'bad' records
+    and left out.
+    """
+    for filename in filenames:
+        data_file = pd.open_data_file(filename)
+        try:
+            for lineno, line in enumerate(data_file, 1):
+                line = line.rstrip('\n')
+                if pd.SKIP_RE.search(line):
+                    continue
+                if pd.END_RE.search(line):
+                    break
+                for word in pd.get_words(line):
+                    if pd.words_okay([word], False):
+                        yield word
+                    else:
+                        report(pd.line_record('bad', filename, lineno, line,
+                                              reason='Dropped "{}"'.format(word)))
+        finally:
+            if data_file is not sys.stdin:
+                data_file.close()
+
+def normalize(words, buffer_lines=DEFAULT_BUFFER_LINES, tmp_dir=None):
+    """Generator which returns the lines of a clean data file for words.
+
+    Duplicate words (ignoring case) are left out.
+    """
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as sort_dir:
+        # Keyed this way, sorting brings together each anagram group, with
+        # its words in the order words_are_alphabetic() wants.
+        keyed_words = ('{}\t{}\t{}'.format(pd.signature(word), word.casefold(), word)
+                       for word in words)
+        sorted_words = external_sort(keyed_words, buffer_lines, sort_dir)
+
+        def group_lines():
+            for line_signature, group in itertools.groupby(
+                    sorted_words, key=lambda item: item.split('\t', 1)[0]):
+                group_words = []
+                last_folded = None
+                for item in group:
+                    _, folded, word = item.split('\t')
+                    if folded != last_folded:
+                        group_words.append(word)
+                        last_folded = folded
+                yield ', '.join(group_words)
+
+        yield from external_sort(group_lines(), buffer_lines, sort_dir)
+
+def parse_args(args):
+    """Parse command line arguments to the program."""
+    parser = argparse.ArgumentParser(description='Clean up raw word warp transcripts')
+    parser.add_argument('--files', '-f', nargs='+', default=['-'],
+                        help='Raw transcript files ("-" for standard input).')
+    parser.add_argument('--output', '-o',
+                        help='Clean data file to write (default: standard output).')
+    parser.add_argument('--buffer_lines', '-b', type=int, default=DEFAULT_BUFFER_LINES,
+                        help='Most words (or lines) to sort in memory at once.')
+    parser.add_argument('--tmp_dir',
+                        help='Directory for temporary sort files.')
+    parser.add_argument('--format', choices=['text', 'jsonl'], default='text',
+                        help='Format of the messages about dropped words.')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Verbose output.')
+    args = parser.parse_args(args)
+    if args.buffer_lines < 1:
+        parser.error('--buffer_lines must be at least 1')
+    # Settings the process_data.py writers look at.
+    args.stats = False
+    return args
+
+def main(args):
+    writer = pd.make_writer(args, sys.stderr)
+    words = transcript_words(args.files, writer.write)
+    lines = normalize(words, args.buffer_lines, args.tmp_dir)
+    if args.output:
+        output = open(args.output, 'w')
+    else:
+        output = sys.stdout
+    try:
+        for line in lines:
+            output.write(line + '\n')
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -15,24 +15,55 @@ Functions:
     words_are_alphabetic(): Checks that the words in a line are
         in alphabetic order.
     line_is_good(): Checks that a line passes all the above checks.
+        (words_okay() and line_is_good() use the compiled rules of word
+        warp from rules.py, which check other games as well.)
+    classify_line(): Classifies a data file line as skip, end, good or bad.
+    game_rules(): Returns the compiled rules (see rules.py) of the --game
+        being checked.
+    check_file(): Checks every line of a single file, and their order.
 
-When invoked as a command-line program, there are 2 modes of operation:
+When invoked as a command-line program, there are 3 modes of operation:
     Default, or when a list of files to process is specified:
         Each line in the files is checked, as well as a check to make sure
             the lines themselves are in alphabetical order.
+        With --cross_check, lines which should have been merged with an
+            earlier line of the same file (same letters) are reported.
+        With --jobs N, the files are checked by N worker processes.
+        With --game or --letters, the files are checked with the rules of
+            another game, such as 5- or 7-letter word warp.
+        With --format jsonl, bad lines and per file statistics are written
+            as JSON Lines records for other programs to read.
+        With --previous SNAPSHOT, only lines that were not good in the
+            (already checked) snapshot are checked again, using the
+            verdicts saved for it by --save_verdicts.
+        With --watch, the files are checked again whenever they change,
+            and only bad lines not already reported are shown.
+        The results for each file are cached (see ResultCache), so a file
+            that has not changed is not checked again; --no-cache turns
+            this off.
     When run interactively: the user is prompted for input and each line
         is individually checked for validity via line_is_good().
+        With --paste, everything typed or pasted at once is checked as a
+            batch, as lines of a file are (order included), and summarized,
+            until an end line; this needs standard input to be a terminal.
+    With --fix: a fixed copy of each file is written (see fix_file()).
 """
 
 import sys
+import os
 import re
-import readline  # Enables history/editing in raw_input() function.
-import argparse
-import fileinput
-import glob
-import unicodedata
+import time
+import collections
+import itertools
+import rules
 
 # Regular expressions for general use.
+# Skip blank lines, comment lines and lines that say "Word warp".
+SKIP_RE = re.compile(r'^$|^#|^[Ww]ord[  ]*[Ww]arp|^Score:|^Rounds:')
+# Quit processing a file after a line starting with 3 dashes or m-dashes.
+# (Note: m-dash unicode codepoint is U+2014)
+END_RE = re.compile('^(-{3})|—{3}')
+
 def get_words(line):
     """Break a line into a list of words.
 
@@ -49,25 +80,22 @@ def line_space_okay(line, debug):
         return False
     return True
 
-# The unicode category for a codepoint is a 2-letter code.
-#   'Lu' is Letter, uppercase.
-#   'Ll' is Letter, lowercase.
-# A 6-letter capitalized word looks like this:
-CATEGORY_MATCH = 'Lu' + 'Ll'*5
-
-def categories(s):
-    """Return a string of unicode categories for the given input."""
-    return ''.join(unicodedata.category(ch) for ch in s)
-
 def words_okay(word_list, debug):
-    """Verify if the words in a line are good (6-letters, capitalized)."""
-    return all(categories(word) == CATEGORY_MATCH for word in word_list)
+    """Verify if the words in a line are good (6-letters, capitalized).
+
+    This is the 'words' check of the word warp rules (see rules.py).
+    """
+    return rules.get_rules().words_okay(word_list, debug)
 
 def words_are_anagrams(word_list, debug):
     """Return whether words in list are anagrams of each other."""
     letters = sorted(word_list[0])
     return all(sorted(word) == letters for word in word_list)
 
+def signature(letters):
+    """Return the anagram signature (casefolded, sorted letters) of a word."""
+    return ''.join(sorted(letters.casefold()))
+
 def words_are_alphabetic(word_list, debug):
     """Return whether words in list are sorted alphabetically."""
     return sorted(word_list) == word_list
@@ -86,25 +114,54 @@ def line_is_good(line, debug):
     - All the words in a line should be sorted alphabetically.
     - All the lines in the file should be sorted alphabetically.
     """
-    if not line_space_okay(line, debug):
-        return (False, 'Bad whitespace.')
+    good, reason, word_list = check_line_words(line, debug)
+    return (good, reason)
 
-    word_list = get_words(line)
-    if not words_okay(word_list, debug):
-        if debug: print(word_list)
-        return (False, 'Did not parse.')
+def check_line_words(line, debug):
+    """Same checks as line_is_good(), also returning the line's words.
+
+    The checks are those of the compiled word warp rules (see rules.py),
+    which split the line into words only once.
+    Returns a (good, reason, word_list) tuple.
+    """
+    return rules.get_rules().check_line_words(line, debug)
+
+# The kinds of line that classify_line() distinguishes.
+SKIP = 'skip'
+END = 'end'
+GOOD = 'good'
+BAD = 'bad'
+
+# The result of classify_line().  For GOOD and BAD lines, words holds the
+# words of the line; for BAD lines, reason says what is wrong with it.
+Verdict = collections.namedtuple('Verdict', ['kind', 'reason', 'words'])
 
-    word_list = [word.casefold() for word in get_words(line)]
-    if debug: print(word_list)
-    if not words_are_anagrams(word_list, debug):
-        return (False, 'Not anagrams')
-    if not words_are_alphabetic(word_list, debug):
-        return (False, 'Not alphabetic')
+def classify_line(line, debug, check_words=check_line_words):
+    """Classify a line of a data file as SKIP, END, GOOD or BAD.
 
-    return (True, 'All is well')
+    This is the per-line check used by both file and interactive mode.
+    Data lines are checked by check_words(), check_line_words() or the
+    check_line_words() of another game's rules.
+    Returns a Verdict.
+    """
+    if SKIP_RE.search(line):
+        return Verdict(SKIP, 'Skipped', None)
+    if END_RE.search(line):
+        return Verdict(END, 'End of data', None)
+    good, reason, word_list = check_words(line, debug)
+    return Verdict(GOOD if good else BAD, reason, word_list)
+
+def game_rules(args):
+    """Return the compiled rules.GameRules for --game and --letters."""
+    return rules.get_rules(args.game, args.letters)
 
 def parse_args(args):
-    """Parse command line arguments to the program."""
+    """Parse command line arguments to the program.
+
+    The default --files (the ww_data* files here) is only looked up for
+    the modes that read files.
+    """
+    import argparse
     parser = argparse.ArgumentParser(description='Process word warp data file')
     parser.add_argument('--test', '-t', action='store_true',
                         help='Run unit tests')
@@ -112,7 +169,12 @@ def parse_args(args):
                         help='Quit after processing arguments')
     parser.add_argument('--interactive', '-i', action='store_true',
                         help='Run interactively (line by line input)')
-    parser.add_argument('--files', '-f', nargs='+', default=sorted(glob.glob('ww_data*')))
+    parser.add_argument('--paste', action='store_true',
+                        help='Interactive, reading pasted lines as a batch, '
+                             'checking their order too, and summarizing them.')
+    parser.add_argument('--files', '-f', nargs='+',
+                        help='Data files to check ("-" for standard input; '
+                             'default: the ww_data* files here).')
     parser.add_argument('--stats', '-s', action='store_true',
                         help='Show statistics for each file processed.')
     parser.add_argument('--verbose', '-v', action='store_true',
@@ -121,113 +183,1150 @@ def parse_args(args):
                         help='Program debug mode: dump argument namespace, regex matches.')
     parser.add_argument('--debug_data', '-d', action='store_true',
                         help='Data debug mode: give hints about bad data.')
+    parser.add_argument('--game', '-g', choices=sorted(rules.GAMES),
+                        default=rules.DEFAULT_GAME,
+                        help='Rules to check lines with.')
+    parser.add_argument('--letters', '-l', type=int,
+                        help='Number of letters in a word (default: the '
+                             "game's).")
     parser.add_argument('--count', '-c', type=int, default=-1,
                         help='Maximum number of lines per file to process.')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Number of worker processes used to check files.')
+    parser.add_argument('--cross_check', '-x', action='store_true',
+                        help='Also report lines which are anagrams of, or '
+                             'share a word with, an earlier line.')
+    parser.add_argument('--totals', action='store_true',
+                        help='Show statistics for all the files together, '
+                             'and count the anagram signatures in each file '
+                             'and in all of them (this takes memory for '
+                             'every signature).')
+    parser.add_argument('--format', choices=['text', 'jsonl'], default='text',
+                        help='Output format: text messages, or JSON Lines with '
+                             'a record per bad line and per file statistics.')
+    parser.add_argument('--fix', action='store_true',
+                        help='Write a fixed copy of each file (named with "{}" '
+                             'added), reporting the lines that could not be '
+                             'fixed.'.format(FIXED_SUFFIX))
+    parser.add_argument('--mmap', '-m', action='store_true',
+                        help='Read files with mmap, checking ASCII lines as bytes '
+                             '(bulk validation; not with --previous, '
+                             '--save_verdicts or --cross_check).')
+    parser.add_argument('--previous', '-p',
+                        help='Previously checked snapshot: only recheck lines '
+                             'that were not good in it.')
+    parser.add_argument('--verdicts',
+                        help='Verdict file for --previous (default: the snapshot '
+                             'name plus "{}").'.format(VERDICT_SUFFIX))
+    parser.add_argument('--save_verdicts', action='store_true',
+                        help='Save the verdict for each line of each file, '
+                             'for later use with --previous.')
+    parser.add_argument('--cache_dir',
+                        help='Directory of the cache of results (default: ${} '
+                             'or ~/.cache/word_warp).'.format(CACHE_DIR_ENV))
+    parser.add_argument('--cache_size', type=float, default=CACHE_SIZE_MB,
+                        help='Most megabytes of results to cache.')
+    parser.add_argument('--no_cache', '--no-cache', action='store_true',
+                        help='Check every file, without using the cache of results.')
+    parser.add_argument('--watch', '-w', nargs='?', type=float,
+                        const=WATCH_INTERVAL, metavar='SECONDS',
+                        help='Keep checking each file again when it changes, '
+                             'showing only new bad lines (looking for changes '
+                             'every {} seconds by default).'.format(WATCH_INTERVAL))
 
-    return parser.parse_args(args)
+    args = parser.parse_args(args)
+    if args.paste:
+        if not sys.stdin.isatty():
+            parser.error('--paste reads from a terminal; use --files - to '
+                         'check standard input')
+        args.interactive = True
+    if args.files is None and not (args.test or args.quit or args.interactive):
+        import glob
+        args.files = sorted(glob.glob('ww_data*'))
+    if args.mmap and (args.previous or args.save_verdicts or args.cross_check):
+        parser.error('--mmap cannot be used with --previous, --save_verdicts '
+                     'or --cross_check')
+    if (args.mmap or args.fix or args.watch) and '-' in (args.files or ['-']):
+        parser.error('--mmap, --fix and --watch cannot read standard input')
+    if args.fix and args.watch:
+        parser.error('--fix cannot be used with --watch')
+    if args.letters is not None and args.letters < 1:
+        parser.error('--letters must be at least 1')
+    if args.fix and game_rules(args).game != rules.get_rules().game:
+        parser.error('--fix only knows how to fix {} lines'.format(rules.DEFAULT_GAME))
+    return args
 
 def get_user_lines(prompt):
     """Generator which returns user input to a given prompt.
 
     A blank line of input terminates the generator.
     """
+    import readline  # Enables history/editing in the input() function.
     while True:
         line = input(prompt).rstrip('\n')
         if line == '':
             break
         yield line
 
+# How long to wait for more of a paste, in seconds.
+PASTE_WAIT = 0.05
+
+def get_pasted_lines(prompt, input_function=input, fd=None):
+    """Generator which returns user input to a given prompt, a batch of
+    lines at a time.
+
+    A line is read with input_function() and then any more input that is
+    already waiting, such as the rest of a paste, is read straight from fd
+    (standard input) without prompting for each line.  Each batch is a
+    list of lines.  A blank line at the prompt terminates the generator.
+
+    fd must be a terminal (or, in tests, a pipe input_function() does not
+    read): the readline input() reads a terminal a byte at a time, so
+    nothing is buffered ahead of fd, whereas input() from a pipe goes
+    through sys.stdin, which may already hold the rest of the paste.
+    """
+    import select
+    import readline  # Enables history/editing in the input() function.
+    if fd is None:
+        fd = sys.stdin.fileno()
+    while True:
+        line = input_function(prompt).rstrip('\n')
+        if line == '':
+            break
+        # With bracketed paste, readline can return several lines at once.
+        lines = line.split('\n')
+        pending = b''
+        while select.select([fd], [], [], PASTE_WAIT)[0]:
+            chunk = os.read(fd, 1 << 16)
+            if not chunk:
+                break
+            pending += chunk
+        lines.extend(pending.decode().splitlines())
+        yield lines
+
 class Stats(object):
-    MAX_ALLOWED_WORDS = 10
+    """Statistics about the good lines of one or more files.
+
+    Stats for separate files (checked one after another, in worker
+    processes, or incrementally) can be combined with + or merge(), giving
+    the same totals as if all the lines had been added to one Stats.
+    Everything is kept in counters, which grow as needed and pickle
+    cheaply.  Only by_signature Stats count the lines with each signature,
+    as that grows with the number of groups; the others take the same
+    memory however many lines they are given.
+    """
 
-    def __init__(self):
+    def __init__(self, by_signature=False):
+        self.lines = 0
         self.good_lines = 0
         self.good_words = 0
-        self.histogram = [0] * Stats.MAX_ALLOWED_WORDS
-        self.most_words = 0
+        self.histogram = collections.Counter()
+        # How often each (casefolded) letter is in the first word of lines
+        # with each number of words, which gives the letter frequencies.
+        self.first_letters = collections.defaultdict(collections.Counter)
+        # Number of lines with each signature, or None if not counted.
+        self.signatures = collections.Counter() if by_signature else None
 
-    def add_line(self, line):
-        self.good_lines += 1
-        word_list = get_words(line)
+    @property
+    def most_words(self):
+        return max(self.histogram, default=0)
+
+    @property
+    def letters(self):
+        """A Counter of how often each (casefolded) letter is used."""
+        letters = collections.Counter()
+        for num_words, first_letters in self.first_letters.items():
+            for letter, count in first_letters.items():
+                letters[letter] += count * num_words
+        return letters
+
+    def add_line(self, line, word_list=None):
+        """Add a good line, given as text or as UTF-8 bytes.
+
+        word_list, if given, is the line's words (as text or bytes), saving
+        splitting the line again.
+        """
+        if word_list is None:
+            if isinstance(line, bytes):
+                line = line.decode()
+            word_list = get_words(line)
+        first_word = word_list[0]
+        if isinstance(first_word, bytes):
+            first_word = first_word.decode()
         num_words = len(word_list)
-        assert(num_words < Stats.MAX_ALLOWED_WORDS)
-        if num_words > self.most_words:
-            self.most_words = num_words
+        self.good_lines += 1
         self.good_words += num_words
         self.histogram[num_words] += 1
+        self.first_letters[num_words].update(first_word.casefold())
+        if self.signatures is not None:
+            self.signatures[signature(first_word)] += 1
 
-    def show(self, indent=''):
-        def iprint(output):
-            print('{}{}'.format(indent, output))
-        iprint('Unique 6-letter combinations: {}'.format(self.good_lines))
-        iprint('Unique words: {}'.format(self.good_words))
-        iprint('Histogram')
-        for i in range(1, self.most_words+1):
-            iprint('  {}-word anagrams: {}'.format(i, self.histogram[i]))
+    def merge(self, other):
+        """Add the statistics of other to these; return self."""
+        self.lines += other.lines
+        self.good_lines += other.good_lines
+        self.good_words += other.good_words
+        self.histogram.update(other.histogram)
+        for num_words, first_letters in other.first_letters.items():
+            self.first_letters[num_words].update(first_letters)
+        if self.signatures is not None and other.signatures is not None:
+            self.signatures.update(other.signatures)
+        return self
 
+    def __iadd__(self, other):
+        return self.merge(other)
 
-def process_files(args):
-    """Process lines in the files given on the command line."""
+    def __add__(self, other):
+        return Stats(self.signatures is not None).merge(self).merge(other)
+
+    def as_record(self):
+        """Return the statistics as a dictionary (for a stats record), with
+        the number of 'signatures' if they are counted."""
+        most_words = self.most_words
+        record = {'good_lines': self.good_lines,
+                  'good_words': self.good_words,
+                  'most_words': most_words,
+                  'histogram': [self.histogram[i] for i in range(1, most_words+1)],
+                  'letters': dict(sorted(self.letters.items()))}
+        if self.signatures is not None:
+            record['signatures'] = len(self.signatures)
+        return record
+
+    def show(self, indent='', output=print, letters=None):
+        show_stats(self.as_record(), indent, output, letters)
 
+def show_stats(record, indent='', output=print, letters=None):
+    """Show the statistics in a record made by Stats.as_record(), for
+    words of letters letters (by default, those of the default game)."""
+    def iprint(text):
+        output('{}{}'.format(indent, text))
+    if letters is None:
+        letters = rules.get_rules().game.letters
+    iprint('Unique {}-letter combinations: {}'.format(letters, record['good_lines']))
+    iprint('Unique words: {}'.format(record['good_words']))
+    iprint('Histogram')
+    for i, num_lines in enumerate(record['histogram'], 1):
+        iprint('  {}-word anagrams: {}'.format(i, num_lines))
+
+# Checking a file produces a series of records, each a dictionary with a
+# 'type' and the name of the 'file'.  The types are:
+#   'processing': the file has lines and is being checked.
+#   'skip', 'end': a skipped line, or the line ending the data (given only
+#       with --verbose).
+#   'bad': a bad line, with its 'line_number', 'line' and 'reason'.  If the
+#       line is out of order, it also has the line it came 'after'.
+#   'fixed': with --fix, the 'output' file written, the number of lines
+#       'rewritten' and of 'repeats' dropped, and whether the lines were
+#       'reordered' (given only with --verbose).
+#   'reused': the 'count' of verdicts reused from the 'previous' snapshot
+#       (given only with --verbose).
+#   'stats': the file's statistics (see Stats.as_record()), with the number
+#       of 'lines' read, the 'elapsed' seconds and the 'lines_per_second'.
+#   'totals': with --totals, the statistics of all the files together, in
+#       the same form as a 'stats' record but with the number of 'files'
+#       instead of a 'file'.
+# Writers turn the records into output.
+OUT_OF_ORDER = 'Out of order'
+
+def line_record(kind, filename, lineno, line, **fields):
+    """Return a record about a single line of a file."""
+    record = {'type': kind, 'file': filename, 'line_number': lineno, 'line': line}
+    record.update(fields)
+    return record
+
+def stats_record(filename, stats, elapsed, kind='stats'):
+    """Return the stats record for a file."""
+    record = {'type': kind, 'file': filename, 'lines': stats.lines,
+              'elapsed': elapsed,
+              'lines_per_second': stats.lines / elapsed if elapsed else 0.0}
+    record.update(stats.as_record())
+    return record
+
+def totals_record(num_files, stats, elapsed):
+    """Return the totals record for the statistics of num_files files."""
+    record = stats_record(None, stats, elapsed, kind='totals')
+    del record['file']
+    record['files'] = num_files
+    return record
+
+class TextWriter(object):
+    """Writes records as the program's traditional text messages."""
+
+    def __init__(self, args, stream):
+        self.args = args
+        self.stream = stream
+
+    def write_line(self, text):
+        self.stream.write(text + '\n')
+
+    def write(self, record):
+        kind = record['type']
+        if kind == 'processing':
+            if self.args.verbose or self.args.stats:
+                self.write_line('Processing "{}"'.format(record['file']))
+        elif kind == 'skip':
+            self.write_line('Skipping "{}".'.format(record['line']))
+        elif kind == 'end':
+            self.write_line('Finishing at {}:"{}".'.format(record['line_number'],
+                                                          record['line']))
+        elif kind == 'bad' and 'after' in record:
+            self.write_line('Bad {}.{}: "{}" after "{}"'.format(record['file'],
+                    record['line_number'], record['line'], record['after']))
+        elif kind == 'bad':
+            self.write_line('Bad {}.{}({}): "{}"'.format(record['file'],
+                    record['line_number'], record['reason'], record['line']))
+        elif kind == 'fixed':
+            self.write_line('Fixed "{}" in "{}": {} lines rewritten, {} repeats '
+                            'dropped{}'.format(record['file'], record['output'],
+                    record['rewritten'], record['repeats'],
+                    ', lines reordered' if record['reordered'] else ''))
+        elif kind == 'cleared':
+            self.write_line('Cleared {} bad lines in "{}"'.format(record['count'],
+                                                                 record['file']))
+        elif kind == 'summary':
+            self.write_line('Checked {} lines: {} good, {} bad, {} skipped'.format(
+                    record['lines'], record['good'], record['bad'], record['skipped']))
+        elif kind == 'reused':
+            self.write_line('Reused {} verdicts from "{}"'.format(record['count'],
+                                                                record['previous']))
+        elif kind == 'stats':
+            if self.args.stats:
+                show_stats(record, indent='  ', output=self.write_line,
+                           letters=game_rules(self.args).game.letters)
+        elif kind == 'totals':
+            self.write_line('Totals for {} files'.format(record['files']))
+            show_stats(record, indent='  ', output=self.write_line,
+                       letters=game_rules(self.args).game.letters)
+
+class JsonWriter(object):
+    """Writes records as JSON Lines: one JSON object per line.
+
+    Bad line, cleared, summary, stats and totals records are always
+    written; the others only with --verbose.
+    """
+
+    def __init__(self, args, stream):
+        import json
+        self.encode = json.JSONEncoder(ensure_ascii=False).encode
+        self.args = args
+        self.stream = stream
+
+    def write(self, record):
+        if (record['type'] in ('bad', 'cleared', 'summary', 'stats', 'totals') or
+                self.args.verbose):
+            self.stream.write(self.encode(record) + '\n')
+
+def make_writer(args, stream=None):
+    """Return the writer for the --format of output."""
+    if stream is None:
+        stream = sys.stdout
+    if args.format == 'jsonl':
+        return JsonWriter(args, stream)
+    return TextWriter(args, stream)
+
+
+def open_data_file(filename):
+    """Open a data file for reading; '-' means standard input."""
+    if filename == '-':
+        return sys.stdin
+    return open(filename)
+
+# A verdict file holds one verdict kind per line of the data file it was
+# made for, after a header giving the SHA-256 of the data file's contents
+# and the game and word length it was checked for (so that a stale verdict
+# file, or one for other rules, is not used).  A line's kind is GOOD only if the line passed
+# line_is_good() and was in order, so the GOOD lines of a verdict file are
+# strictly increasing.
+VERDICT_SUFFIX = '.verdicts'
+VERDICT_HEADER = '# verdicts for sha256 {}, {} with {} letters\n'
+
+def verdict_filename(filename):
+    """Return the default verdict file name for a data file."""
+    return filename + VERDICT_SUFFIX
+
+def file_digest(filename):
+    """Return the SHA-256 of the contents of a file, in hex."""
+    import hashlib
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as data_file:
+        for block in iter(lambda: data_file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def verdict_header(filename, game):
+    """Return the verdict file header for a data file checked with the
+    rules.Game game."""
+    return VERDICT_HEADER.format(file_digest(filename), game.name, game.letters)
+
+def save_verdicts(filename, kinds, game):
+    """Save the verdict kinds for the lines of a data file checked with
+    the rules.Game game."""
+    with open(verdict_filename(filename), 'w') as verdict_file:
+        verdict_file.write(verdict_header(filename, game))
+        for kind in kinds:
+            verdict_file.write(kind + '\n')
+
+def read_good_lines(filename, verdicts=None, game=None):
+    """Generator which returns the lines of filename with a GOOD verdict.
+
+    The verdicts are read from the verdict file alongside the data file,
+    rather than being recomputed.  If there is no verdict file, or it was
+    made for a different version of the data file or another game than
+    the rules.Game game (by default, the default game), nothing is
+    returned.
+    """
+    if verdicts is None:
+        verdicts = verdict_filename(filename)
+    if game is None:
+        game = rules.get_rules().game
+    try:
+        verdict_file = open(verdicts)
+    except FileNotFoundError:
+        return
+    with verdict_file, open(filename) as data_file:
+        if verdict_file.readline() != verdict_header(filename, game):
+            return
+        for line, kind in zip(data_file, verdict_file):
+            if kind == GOOD + '\n':
+                yield line.rstrip('\n')
+
+class KnownGood(object):
+    """Lines already known to be good, looked up in a single merge pass.
+
+    The known good lines come from a sorted snapshot, and lookups are made
+    in sorted order, so the two are merged: each lookup just advances past
+    known lines that are smaller than the line looked up.
+    """
+
+    def __init__(self, good_lines):
+        self.good_lines = iter(good_lines)
+        self.current = next(self.good_lines, None)
+        self.hits = 0
+
+    def contains(self, line):
+        while self.current is not None and self.current < line:
+            self.current = next(self.good_lines, None)
+        if self.current == line:
+            self.hits += 1
+            return True
+        return False
+
+class CrossCheck(object):
+    """Finds lines of a file that belong together, in a single pass.
+
+    Every good line is a group of anagrams, so two lines with the same
+    signature are really one group split in two, and a word appearing on
+    two lines is a special case of that.  The first line seen with each
+    signature is remembered, so memory grows with the number of groups in
+    the file being checked, not with the number of files.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.lines = {}
+
+    def check(self, lineno, word_list):
+        """Check a good line's words against the lines seen before it.
+
+        Return None if the line's group is new, otherwise the reason the
+        line collides with an earlier line, giving the earlier location.
+        """
+        line_signature = signature(word_list[0])
+        earlier = self.lines.get(line_signature)
+        if earlier is None:
+            self.lines[line_signature] = (lineno, word_list)
+            return None
+        earlier_lineno, earlier_words = earlier
+        location = '{}.{}'.format(self.filename, earlier_lineno)
+        folded_words = set(word.casefold() for word in earlier_words)
+        for word in word_list:
+            if word.casefold() in folded_words:
+                return 'Duplicate of "{}" at {}'.format(word, location)
+        return 'Anagram of {}'.format(location)
+
+def check_file(filename, args, report):
+    """Check the lines of a single file, passing records to report().
+
+    All per file state (the last good line, the statistics, the line count)
+    lives here, so files can be checked independently of each other.
+    With --previous, lines that were good in the previous snapshot are not
+    checked again; only their order is.
+    Return (True if every line in the file was good, the file's Stats).
+    """
+    start_time = time.perf_counter()
     succeeded = True
-    at_beginning = True
-
-    for line in fileinput.input(args.files):
-        line = line.rstrip('\n')
-
-        # At the beginning of each file, reset per file state, and print
-        #    statistics for the previous file.
-        if fileinput.isfirstline():
-            if args.stats and not at_beginning:
-                my_stats.show(indent='  ')
-            last_good_line = ''
-            my_stats = Stats()
-            count = 0
-            if args.verbose or args.stats:
-                print('Processing "{}"'.format(fileinput.filename()))
-        at_beginning = False
-        if count == args.count:
-            fileinput.nextfile()
-            continue
-        else:
+    last_good_line = ''
+    my_stats = Stats(args.totals)
+    count = 0
+    lineno = 0
+    kinds = []
+    known_good = None
+    if args.previous:
+        known_good = KnownGood(read_good_lines(args.previous, args.verdicts,
+                                               game_rules(args).game))
+    data_file = open_data_file(filename)
+    if data_file is sys.stdin:
+        filename = '<stdin>'
+    cross_check = CrossCheck(filename) if args.cross_check else None
+    check_words = game_rules(args).check_line_words
+
+    try:
+        for lineno, line in enumerate(data_file, 1):
+            line = line.rstrip('\n')
+
+            # Only report on a file once it turns out to have lines.
+            if lineno == 1:
+                report({'type': 'processing', 'file': filename})
+            if count == args.count:
+                break
             count += 1
 
-        # Skip blank lines, comment lines and lines that say "Word warp".
-        SKIP_RE = r'^$|^#|^[Ww]ord[  ]*[Ww]arp|^Score:|^Rounds:'
-        if re.search(SKIP_RE, line):
-            if args.verbose: print('Skipping "{}".'.format(line))
-            continue
+            if known_good is not None and known_good.contains(line):
+                verdict = Verdict(GOOD, 'All is well', None)
+            else:
+                verdict = classify_line(line, args.debug_program, check_words)
+            if verdict.kind == SKIP:
+                if args.save_verdicts: kinds.append(SKIP)
+                if args.verbose: report(line_record('skip', filename, lineno, line))
+                continue
+            if verdict.kind == END:
+                if args.save_verdicts: kinds.append(END)
+                if args.verbose: report(line_record('end', filename, lineno, line))
+                break
+
+            if verdict.kind == BAD:
+                if args.save_verdicts: kinds.append(BAD)
+                succeeded = False
+                report(line_record('bad', filename, lineno, line,
+                                   reason=verdict.reason))
+                continue
+
+            # A line that collides with an earlier one is bad, but (as with
+            # InputChecker) it still moves the order check along.
+            kind = GOOD
+            if cross_check is not None:
+                reason = cross_check.check(lineno, verdict.words or get_words(line))
+                if reason is not None:
+                    kind = BAD
+                    report(line_record('bad', filename, lineno, line, reason=reason))
+
+            if not line > last_good_line:
+                kind = BAD
+                report(line_record('bad', filename, lineno, line,
+                                   reason=OUT_OF_ORDER, after=last_good_line))
+            else:
+                last_good_line = line
+            if args.save_verdicts: kinds.append(kind)
+            if kind == GOOD:
+                my_stats.add_line(line, verdict.words)
+            else:
+                succeeded = False
+    finally:
+        if data_file is not sys.stdin:
+            data_file.close()
+
+    if known_good is not None and args.verbose:
+        report({'type': 'reused', 'file': filename, 'count': known_good.hits,
+                'previous': args.previous})
+    if args.save_verdicts and data_file is not sys.stdin:
+        save_verdicts(filename, kinds, game_rules(args).game)
+
+    # Report the stats for the file.
+    my_stats.lines = count
+    if lineno > 0:
+        report(stats_record(filename, my_stats, time.perf_counter() - start_time))
+
+    return succeeded, my_stats
 
-        # Quit processing a file after a line starting with 3 dashes or m-dashes.
-        # (Note: m-dash unicode codepoint is U+2014)
-        END_RE = '^(-{3})|—{3}'
-        if re.search(END_RE, line):
+def mapped_lines(filename):
+    """Generator which returns the lines of a file as bytes, via mmap.
+
+    Lines are found by searching the mapped file for newlines, so the only
+    copy made of a line is the bytes object returned for it.  The newline
+    (and a carriage return before it) is not included.
+    """
+    import mmap
+    with open(filename, 'rb') as data_file:
+        if os.fstat(data_file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(data_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            start = 0
+            end = len(data)
+            while start < end:
+                newline = data.find(b'\n', start)
+                if newline < 0:
+                    newline = end
+                line = data[start:newline]
+                if line.endswith(b'\r'):
+                    line = line[:-1]
+                yield line
+                start = newline + 1
+
+def classify_bytes_line(line, debug, game=None):
+    """Classify a line of a data file, given as UTF-8 bytes.
+
+    Lines of plain ASCII words are checked without decoding them, by the
+    check_bytes_line() of game (the GameRules to check with; word warp's
+    by default), and the words of the Verdict are then bytes.  Any other
+    line is decoded and handed to classify_line(), which has the
+    Unicode-aware checks.
+    """
+    if game is None:
+        game = rules.get_rules()
+    result = game.check_bytes_line(line, debug)
+    if result is not None:
+        good, reason, word_list = result
+        return Verdict(GOOD if good else BAD, reason, word_list)
+    return classify_line(line.decode(), debug, game.check_line_words)
+
+def check_mapped_file(filename, args, report):
+    """Check a single file like check_file(), reading it with mapped_lines().
+
+    Lines stay as bytes; they are only decoded for the Unicode checks and
+    for messages.  Since UTF-8 sorts bytes in code point order, the order
+    check gives the same result on bytes as on the decoded lines.
+    This is the bulk validation path (--mmap), so it does not support
+    --previous, --save_verdicts or --cross_check.
+    Return (True if every line in the file was good, the file's Stats).
+    """
+    start_time = time.perf_counter()
+    succeeded = True
+    last_good_line = b''
+    my_stats = Stats(args.totals)
+    count = 0
+    lineno = 0
+    game = game_rules(args)
+
+    for lineno, line in enumerate(mapped_lines(filename), 1):
+        if lineno == 1:
+            report({'type': 'processing', 'file': filename})
+        if count == args.count:
+            break
+        count += 1
+
+        verdict = classify_bytes_line(line, args.debug_program, game)
+        if verdict.kind == SKIP:
             if args.verbose:
-                print('Finishing at {}:"{}".'.format(fileinput.filelineno(), line))
-            fileinput.nextfile()
+                report(line_record('skip', filename, lineno, line.decode()))
             continue
+        if verdict.kind == END:
+            if args.verbose:
+                report(line_record('end', filename, lineno, line.decode()))
+            break
 
-        line_good, reason = line_is_good(line, args.debug_program)
-        if not line_good:
+        if verdict.kind == BAD:
             succeeded = False
-            print('Bad {}.{}({}): "{}"'.format(fileinput.filename(),
-                    fileinput.filelineno(), reason, line))
+            report(line_record('bad', filename, lineno, line.decode(),
+                               reason=verdict.reason))
         elif not line > last_good_line:
             succeeded = False
-            print('Bad {}.{}: "{}" after "{}"'.format(fileinput.filename(),
-                    fileinput.filelineno(), line, last_good_line))
+            report(line_record('bad', filename, lineno, line.decode(),
+                               reason=OUT_OF_ORDER, after=last_good_line.decode()))
         else:
             last_good_line = line
-            my_stats.add_line(line)
+            my_stats.add_line(line, verdict.words)
+
+    my_stats.lines = count
+    if lineno > 0:
+        report(stats_record(filename, my_stats, time.perf_counter() - start_time))
+
+    return succeeded, my_stats
+
+def check_file_report(filename, args):
+    """Check a single file, returning (succeeded, Stats, list of records).
+
+    This is the unit of work handed to each worker process by --jobs.
+    """
+    records = []
+    succeeded, stats = get_checker(args)(filename, args, records.append)
+    return succeeded, stats, records
+
+def get_checker(args):
+    """Return the function that checks each file: check_file() or, for
+    --mmap, check_mapped_file()."""
+    if args.mmap:
+        return check_mapped_file
+    return check_file
+
+# Bump this when the checks, or the records and Stats they make, change, so
+# that results cached by an older version are not used.
+CACHE_VERSION = 4
+CACHE_DIR_ENV = 'WORD_WARP_CACHE'
+CACHE_FILE = 'results.sqlite'
+CACHE_SIZE_MB = 64
 
-    # Print the stats for the last file.
-    if args.stats and not at_beginning:
-        my_stats.show(indent='  ')
+def cache_dir(args):
+    """Return the directory for the cache of results."""
+    if args.cache_dir:
+        return args.cache_dir
+    if os.environ.get(CACHE_DIR_ENV):
+        return os.environ[CACHE_DIR_ENV]
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(
+        os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'word_warp')
 
-    if succeeded:
+def use_cache(args, files):
+    """Return whether the results for files can come from the cache.
+
+    Not for standard input, nor when checking has side effects that a
+    cached result would skip (saving verdicts, debug output) or depends on
+    another file (--previous).
+    """
+    return not (args.no_cache or '-' in files or args.previous or
+                args.save_verdicts or args.debug_program)
+
+class ResultCache(object):
+    """Results of checking files, kept in an SQLite database.
+
+    A result is what check_file_report() returns, stored under the SHA-256
+    of the file's contents, CACHE_VERSION and the options that change the
+    records, so an unchanged file is answered from the cache whatever it is
+    called.  The cache holds at most max_bytes of results; the least
+    recently used ones are dropped to make room.
+    """
+
+    def __init__(self, directory, max_bytes):
+        import sqlite3
+        os.makedirs(directory, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(os.path.join(directory, CACHE_FILE), timeout=30)
+        try:
+            with self.db:
+                self.db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, '
+                                'result BLOB NOT NULL, size INTEGER NOT NULL, '
+                                'used REAL NOT NULL)')
+        except sqlite3.Error:
+            self.db.close()
+            raise
+
+    def close(self):
+        self.db.close()
+
+    def key(self, filename, args):
+        """Return the key for the result of checking filename with args, and
+        what file_key() said about the file before it was read."""
+        before = file_key(filename)
+        # Cross check reasons give the file name, so those results are only
+        # good for the same name.
+        options = (CACHE_VERSION, args.game, args.letters, args.verbose, args.count,
+                   args.totals,
+                   filename if args.cross_check else None)
+        return '{} {!r}'.format(file_digest(filename), options), before
+
+    def get(self, key, filename):
+        """Return the cached result for key, with its records naming
+        filename, or None if there is none."""
+        import pickle
+        row = self.db.execute('SELECT result FROM results WHERE key = ?',
+                              (key,)).fetchone()
+        if row is None:
+            return None
+        with self.db:
+            self.db.execute('UPDATE results SET used = ? WHERE key = ?',
+                            (time.time(), key))
+        succeeded, stats_fields, records = pickle.loads(row[0])
+        stats = Stats()
+        vars(stats).update(stats_fields)
+        for record in records:
+            if 'file' in record:
+                record['file'] = filename
+        return succeeded, stats, records
+
+    def put(self, key, result):
+        """Cache a result under key, dropping old results if over size.
+
+        The Stats are stored as their fields, since the class is
+        __main__.Stats when this module is run as a program, and
+        process_data.Stats when it is imported.
+        """
+        import pickle
+        succeeded, stats, records = result
+        blob = pickle.dumps((succeeded, vars(stats), records),
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self.db:
+            self.db.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)',
+                            (key, blob, len(blob), time.time()))
+            total, = self.db.execute('SELECT SUM(size) FROM results').fetchone()
+            if total > self.max_bytes:
+                rows = self.db.execute('SELECT key, size FROM results '
+                                       'ORDER BY used').fetchall()
+                for old_key, size in rows:
+                    if total <= self.max_bytes:
+                        break
+                    self.db.execute('DELETE FROM results WHERE key = ?', (old_key,))
+                    total -= size
+
+def open_cache(args):
+    """Return the ResultCache for args, or None, with a warning, if the
+    cache directory cannot be used."""
+    import sqlite3
+    directory = cache_dir(args)
+    try:
+        return ResultCache(directory, int(args.cache_size * 1024 * 1024))
+    except (OSError, sqlite3.Error) as error:
+        print('Not caching results in "{}": {}'.format(directory, error),
+              file=sys.stderr)
+        return None
+
+def cached_result(cache, filename, args):
+    """Return (key, cached result for filename, or None) for check_files()."""
+    start_time = time.perf_counter()
+    key = cache.key(filename, args)
+    result = cache.get(key[0], filename)
+    if result is not None:
+        # Report how long answering from the cache took.
+        elapsed = time.perf_counter() - start_time
+        for record in result[2]:
+            if record['type'] == 'stats':
+                record.update(elapsed=elapsed, cached=True,
+                              lines_per_second=record['lines'] / elapsed if elapsed else 0.0)
+    return key, result
+
+def check_files(files, args, cache=None):
+    """Generator which returns (succeeded, Stats, records) for each file,
+    in order.
+
+    Files with a result in the cache are answered from it.  The others are
+    checked (by --jobs worker processes, if more than one) and their
+    results added to the cache, unless the file changed while it was read.
+    """
+    keys = {}
+    results = {}
+    if cache is not None:
+        for filename in files:
+            keys[filename], results[filename] = cached_result(cache, filename, args)
+    to_check = [filename for filename in files if results.get(filename) is None]
+
+    if args.jobs > 1 and len(to_check) > 1:
+        import functools
+        import multiprocessing
+        worker = functools.partial(check_file_report, args=args)
+        pool = multiprocessing.Pool(min(args.jobs, len(to_check)))
+        checked = pool.imap(worker, to_check)
+    else:
+        pool = None
+        checked = (check_file_report(filename, args) for filename in to_check)
+    try:
+        for filename in files:
+            result = results.get(filename)
+            if result is None:
+                result = next(checked)
+                if cache is not None:
+                    key, before = keys[filename]
+                    if file_key(filename) == before:
+                        cache.put(key, result)
+            yield result
+    finally:
+        if pool is not None:
+            pool.terminate()
+
+def process_files(args):
+    """Process lines in the files given on the command line.
+
+    With --fix, fixed copies of the files are written instead (fix_files()).
+    With --watch, the files are watched for changes (watch_files()).
+    Otherwise the files are checked by check_files(), with the results
+    cached, or (with --no-cache and one job) by checking each file as its
+    lines are read.  Reports are printed in the original file order, so the
+    output is the same however the files are checked.
+    """
+    if args.fix:
+        return fix_files(args)
+    if args.watch:
+        return watch_files(args)
+
+    start_time = time.perf_counter()
+    files = args.files or ['-']
+    writer = make_writer(args)
+    results = []
+    total_stats = Stats(args.totals)
+    cache = None
+    if use_cache(args, files):
+        cache = open_cache(args)
+    try:
+        if cache is not None or (args.jobs > 1 and len(files) > 1 and '-' not in files):
+            for succeeded, stats, records in check_files(files, args, cache):
+                for record in records:
+                    writer.write(record)
+                results.append(succeeded)
+                total_stats += stats
+        else:
+            checker = get_checker(args)
+            for filename in files:
+                succeeded, stats = checker(filename, args, writer.write)
+                results.append(succeeded)
+                total_stats += stats
+    finally:
+        if cache is not None:
+            cache.close()
+    if args.totals:
+        writer.write(totals_record(len(files), total_stats,
+                                   time.perf_counter() - start_time))
+    writer.stream.flush()
+
+    if all(results):
+        return 0
+    return 1
+
+FIXED_SUFFIX = '.fixed'
+
+def fix_line(line, debug):
+    """Try to turn a bad line into a good one.
+
+    Empty words are dropped, the words are capitalized if that is all that
+    is wrong with them, repeated words are dropped, and the words are put
+    in alphabetical order, joined by ', '.  line_is_good() has the final
+    say on whether the result is fixed.
+    Returns (fixed line, None), or (line, reason) if the line can't be
+    fixed (its words are not all 6 letters, or not anagrams).
+    """
+    word_list = [word for word in get_words(line) if word]
+    if not word_list:
+        return (line, 'Did not parse.')
+    if not words_okay(word_list, debug):
+        word_list = [word.capitalize() for word in word_list]
+        if not words_okay(word_list, debug):
+            return (line, 'Did not parse.')
+    if not words_are_anagrams([word.casefold() for word in word_list], debug):
+        return (line, 'Not anagrams')
+    fixed_words = []
+    for word in sorted(word_list, key=str.casefold):
+        if not fixed_words or fixed_words[-1].casefold() != word.casefold():
+            fixed_words.append(word)
+    fixed = ', '.join(fixed_words)
+    good, reason = line_is_good(fixed, debug)
+    if not good:
+        return (line, reason)
+    return (fixed, None)
+
+def fix_file(filename, args, report):
+    """Write a fixed copy of a file; return True if every line was fixed.
+
+    The file is read in one pass, fixing each data line as it goes (see
+    fix_line()).  The data lines are then sorted, dropping repeats, and put
+    back in the places data lines held, so skipped lines keep their
+    places, and everything from the end line on is copied as is.  Lines
+    that can't be fixed are kept, and passed to report() as 'bad' records.
+    The copy is written to a temporary file which is then renamed to the
+    file name plus FIXED_SUFFIX, so it appears complete or not at all.
+    """
+    import tempfile
+    succeeded = True
+    lines = []
+    data_slots = []
+    original_lines = []
+    data_lines = []
+    with open(filename) as data_file:
+        for lineno, line in enumerate(data_file, 1):
+            line = line.rstrip('\n')
+            verdict = classify_line(line, args.debug_program)
+            if verdict.kind == END:
+                lines.append(line)
+                lines.extend(rest.rstrip('\n') for rest in data_file)
+                break
+            if verdict.kind == SKIP:
+                lines.append(line)
+                continue
+            original_lines.append(line)
+            if verdict.kind == BAD:
+                line, reason = fix_line(line, args.debug_program)
+                if reason is not None:
+                    succeeded = False
+                    report(line_record('bad', filename, lineno, line, reason=reason))
+            data_slots.append(len(lines))
+            lines.append(None)
+            data_lines.append(line)
+
+    rewritten = sum(1 for old, new in zip(original_lines, data_lines) if old != new)
+    sorted_lines = sorted(set(data_lines))
+    reordered = sorted_lines != data_lines
+    repeats = len(data_lines) - len(sorted_lines)
+    for slot, line in itertools.zip_longest(data_slots, sorted_lines):
+        lines[slot] = line
+
+    fixed_name = filename + FIXED_SUFFIX
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)))
+    try:
+        with open(fd, 'w') as fixed_file:
+            for line in lines:
+                if line is not None:
+                    fixed_file.write(line + '\n')
+        os.replace(tmp_name, fixed_name)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+    if args.verbose:
+        report({'type': 'fixed', 'file': filename, 'output': fixed_name,
+                'rewritten': rewritten, 'repeats': repeats, 'reordered': reordered})
+    return succeeded
+
+def fix_files(args):
+    """Write a fixed copy of each of the files given on the command line."""
+    writer = make_writer(args)
+    results = [fix_file(filename, args, writer.write) for filename in args.files]
+    writer.stream.flush()
+    if all(results):
         return 0
     return 1
 
+# How often --watch looks for changed files, in seconds.
+WATCH_INTERVAL = 0.25
+
+def file_key(filename):
+    """Return what --watch compares to tell whether a file has changed.
+
+    Returns None if the file is missing, as it can briefly be while an
+    editor saves it.
+    """
+    try:
+        status = os.stat(filename)
+    except FileNotFoundError:
+        return None
+    return (status.st_ino, status.st_size, status.st_mtime_ns)
+
+def diagnostic_key(record):
+    """Return what identifies a bad line record, apart from its line number.
+
+    A bad line is the same problem after lines above it are added or
+    removed, so it is not reported again.
+    """
+    return (record['line'], record['reason'], record.get('after'))
+
+class FileWatcher(object):
+    """Keeps the results of checking files, and checks again just the
+    files that have changed since."""
+
+    def __init__(self, args, report):
+        self.args = args
+        self.report = report
+        self.keys = {}
+        self.diagnostics = {}
+        self.results = {}
+
+    def poll(self):
+        """Check each file that is new or changed since the last poll.
+
+        The records for a checked file go to report(), except bad line
+        records already reported for the file.  A 'cleared' record counts
+        the bad lines reported before that are gone.
+        Returns the names of the files checked.
+        """
+        checked = []
+        for filename in self.args.files:
+            key = file_key(filename)
+            if key is None or key == self.keys.get(filename):
+                continue
+            self.keys[filename] = key
+            succeeded, stats, records = check_file_report(filename, self.args)
+            old = self.diagnostics.get(filename, collections.Counter())
+            new = collections.Counter()
+            for record in records:
+                if record['type'] == 'bad':
+                    diagnostic = diagnostic_key(record)
+                    new[diagnostic] += 1
+                    if new[diagnostic] <= old[diagnostic]:
+                        continue
+                self.report(record)
+            cleared = sum((old - new).values())
+            if cleared:
+                self.report({'type': 'cleared', 'file': filename, 'count': cleared})
+            self.diagnostics[filename] = new
+            self.results[filename] = succeeded
+            checked.append(filename)
+        return checked
+
+def watch_files(args):
+    """Check the files given on the command line, then check each one again
+    whenever it changes, until interrupted.
+
+    Files are polled (a stat() each) every --watch seconds, which is cheap
+    for a list of data files and needs nothing outside the standard library.
+    """
+    writer = make_writer(args)
+    watcher = FileWatcher(args, writer.write)
+    try:
+        while True:
+            if watcher.poll():
+                writer.stream.flush()
+            time.sleep(args.watch)
+    except KeyboardInterrupt:
+        pass
+    if all(watcher.results.values()):
+        return 0
+    return 1
+
+# The file name given in records about lines typed or pasted with --paste.
+INPUT_NAME = '<input>'
+
+class InputChecker(object):
+    """Checks batches of lines typed or pasted with --paste.
+
+    The lines are checked as the lines of one file would be, so the order
+    check (and --cross_check) carries on from one batch to the next, and
+    checking stops at an end line (ended is then True).
+    """
+
+    def __init__(self, args, report):
+        self.args = args
+        self.report = report
+        self.lineno = 0
+        self.last_good_line = ''
+        self.ended = False
+        self.cross_check = CrossCheck(INPUT_NAME) if args.cross_check else None
+        self.check_words = game_rules(args).check_line_words
+
+    def check(self, lines):
+        """Check a batch of lines, reporting the bad ones.
+
+        Returns a summary record counting the good, bad and skipped lines;
+        lines after an end line are not checked or counted.
+        """
+        counts = collections.Counter()
+        checked = 0
+        for line in lines:
+            if self.ended:
+                break
+            checked += 1
+            self.lineno += 1
+            verdict = classify_line(line, self.args.debug_program, self.check_words)
+            if verdict.kind in (SKIP, END):
+                counts[SKIP] += 1
+                self.ended = verdict.kind == END
+                continue
+            if verdict.kind == BAD:
+                counts[BAD] += 1
+                self.report(line_record('bad', INPUT_NAME, self.lineno, line,
+                                        reason=verdict.reason))
+                continue
+            kind = GOOD
+            if self.cross_check is not None:
+                reason = self.cross_check.check(self.lineno, verdict.words)
+                if reason is not None:
+                    kind = BAD
+                    self.report(line_record('bad', INPUT_NAME, self.lineno, line,
+                                            reason=reason))
+            if not line > self.last_good_line:
+                kind = BAD
+                self.report(line_record('bad', INPUT_NAME, self.lineno, line,
+                                        reason=OUT_OF_ORDER, after=self.last_good_line))
+            else:
+                self.last_good_line = line
+            counts[kind] += 1
+        return {'type': 'summary', 'file': INPUT_NAME, 'lines': checked,
+                'good': counts[GOOD], 'bad': counts[BAD], 'skipped': counts[SKIP]}
+
+def check_pasted_input(args):
+    """Check what the user types or pastes, a batch at a time (--paste)."""
+    writer = make_writer(args)
+    checker = InputChecker(args, writer.write)
+    for lines in get_pasted_lines('Please type or paste lines -> '):
+        writer.write(checker.check(lines))
+        writer.stream.flush()
+        if checker.ended:
+            break
+
 if __name__ == '__main__':
     args = parse_args(sys.argv[1:])
     if args.debug_program or args.quit:
@@ -239,12 +1338,17 @@ if __name__ == '__main__':
         from test_word_warp import main as test_main
         sys.exit(test_main())
 
-    if args.interactive:
+    if args.paste:
+        check_pasted_input(args)
+    elif args.interactive:
+        check_words = game_rules(args).check_line_words
         for line in get_user_lines('Please type a line -> '):
-            line_good, reason = line_is_good(line, args.debug_program)
-            if line_good:
+            verdict = classify_line(line, args.debug_program, check_words)
+            if verdict.kind == GOOD:
                 print('Good: "{}"'.format(line))
+            elif verdict.kind == BAD:
+                print('Bad ({}): "{}"'.format(verdict.reason, line))
             else:
-                print('Bad ({}): "{}"'.format(reason, line))
+                print('{}: "{}"'.format(verdict.reason, line))
     else:
         sys.exit(process_files(args))
@@ -0,0 +1,202 @@
+#! /usr/bin/env python3
+"""The rules of word warp games, compiled into line checks.
+
+process_data.py was written for 6-letter capitalized words, but the same
+game is played with other word lengths.  A Game describes one: the length
+of its words, how they are capitalized, and which checks a line has to
+pass, in order.  compile_game() turns a Game into GameRules, whose check
+functions are generated as Python source for exactly those rules and
+compiled once.  They are the only implementation of the checks:
+process_data.py checks word warp lines with the compiled rules of the
+default game.
+
+The checks are:
+    'whitespace': Words are separated by ', ', with no other spaces.
+    'words': Every word has the right length and capitalization.
+    'anagrams': The words are anagrams of each other.
+    'alphabetic': The words are in alphabetical order.
+
+Functions:
+    compile_game(): Compiles the rules of a Game.
+    get_rules(): Returns the compiled rules of a game in GAMES.
+"""
+
+import re
+import collections
+import functools
+
+Game = collections.namedtuple('Game', ['name', 'letters', 'capitalization', 'checks'])
+
+CHECKS = ('whitespace', 'words', 'anagrams', 'alphabetic')
+
+# What each check says about a line that fails it.
+REASONS = {'whitespace': 'Bad whitespace.',
+           'words': 'Did not parse.',
+           'anagrams': 'Not anagrams',
+           'alphabetic': 'Not alphabetic'}
+
+# For each capitalization policy, the ASCII character classes and the
+# unicode categories of the first and the other letters of a word.
+CAPITALIZATION = {'capitalized': ('[A-Z]', '[a-z]', 'Lu', 'Ll'),
+                  'lower': ('[a-z]', '[a-z]', 'Ll', 'Ll'),
+                  'upper': ('[A-Z]', '[A-Z]', 'Lu', 'Lu'),
+                  'any': ('[A-Za-z]', '[A-Za-z]', '(?:Lu|Ll)', '(?:Lu|Ll)')}
+
+GAMES = {'word_warp': Game('word_warp', 6, 'capitalized', CHECKS),
+         'word_warp_5': Game('word_warp_5', 5, 'capitalized', CHECKS),
+         'word_warp_7': Game('word_warp_7', 7, 'capitalized', CHECKS)}
+
+DEFAULT_GAME = 'word_warp'
+
+# The compiled rules of a game.  check_line_words(line, debug) returns
+# (good, reason, word list), which process_data.check_line_words() returns
+# for word warp.  check_bytes_line(line, debug) does the same for a line of
+# ASCII words given as bytes, and returns None for any other line, which
+# has to be decoded and checked with check_line_words().
+# words_okay(word_list, debug) is the 'words' check on its own.
+GameRules = collections.namedtuple('GameRules', ['game', 'check_line_words',
+                                                 'check_bytes_line', 'words_okay',
+                                                 'source'])
+
+def categories(s):
+    """Return a string of unicode categories for the given input."""
+    import unicodedata
+    return ''.join(unicodedata.category(ch) for ch in s)
+
+def multiword_check(check, source, state):
+    """Add the source for an anagrams or alphabetic check to source.
+
+    Both always pass for a line of one word, so they are skipped for one.
+    state['folded'] records whether folded_list has been made yet.
+    """
+    source.append('    if len(word_list) > 1:')
+    if not state['folded']:
+        source.append('        folded_list = {}'.format(state['fold']))
+        if not state['bytes']:
+            source.append('        if debug: print(folded_list)')
+        state['folded'] = True
+    if check == 'anagrams':
+        source.append('        letters = sorted(folded_list[0])')
+        source.append('        if not all(sorted(word) == letters for word in folded_list):')
+    else:
+        source.append('        if sorted(folded_list) != folded_list:')
+    source.append('            return (False, {!r}, word_list)'.format(REASONS[check]))
+
+def words_check_source(game, joined):
+    """Return the source of the 'words' check, which sets okay for the
+    words of word_list, joined being the source of the words joined by ', '.
+
+    Plain ASCII words are checked all at once with words_re; only words
+    with other characters need their unicode categories looked up.
+    """
+    return ['    if {}.isascii():'.format(joined),
+            '        okay = words_re.fullmatch({}) is not None'.format(joined),
+            '    else:',
+            '        okay = all({} for word in word_list)'.format(
+                'categories(word) == category_match' if game.capitalization != 'any'
+                else 'category_re.fullmatch(categories(word))')]
+
+def words_source(game):
+    """Return the source of words_okay() for a game.
+
+    Unlike the words of a line, the words given to words_okay() may have
+    commas in them, and a word with ', ' in it would pass as two words, so
+    the joined words must have just the commas that join them.
+    """
+    return (['def words_okay(word_list, debug):',
+             '    if not word_list:',
+             '        return True',
+             "    joined = ', '.join(word_list)"] +
+            words_check_source(game, 'joined') +
+            ["    return okay and joined.count(',') == len(word_list) - 1"])
+
+def line_check_source(game):
+    """Return the source of check_line_words() for a game."""
+    source = ['def check_line_words(line, debug):',
+              "    word_list = [word.strip() for word in line.split(',')]"]
+    state = {'folded': False, 'bytes': False,
+             'fold': '[word.casefold() for word in word_list]'}
+    spaced = False
+    for check in game.checks:
+        if check == 'whitespace':
+            source.append("    if line != line.strip() or ', '.join(word_list) != line:")
+            source.append('        return (False, {!r}, word_list)'.format(REASONS[check]))
+            spaced = True
+        elif check == 'words':
+            # Once the whitespace is checked, the line is the words joined.
+            joined = 'line' if spaced else "', '.join(word_list)"
+            source.extend(words_check_source(game, joined))
+            source.append('    if not okay:')
+            source.append('        if debug: print(word_list)')
+            source.append('        return (False, {!r}, word_list)'.format(REASONS[check]))
+        else:
+            multiword_check(check, source, state)
+    source.append("    return (True, 'All is well', word_list)")
+    return source
+
+def bytes_check_source(game):
+    """Return the source of check_bytes_line() for a game."""
+    source = ['def check_bytes_line(line, debug):']
+    if game.letters >= 8:
+        # Words this long could be "Wordwarp" header lines, which only
+        # the full checks skip.
+        source.append('    return None')
+        return source
+    source.extend(['    if ascii_line_re.fullmatch(line) is None:',
+                   '        return None',
+                   "    word_list = line.split(b', ')"])
+    state = {'folded': False, 'bytes': True, 'fold': "line.lower().split(b', ')"}
+    for check in game.checks:
+        # A line that matches ascii_line_re passes these two.
+        if check not in ('whitespace', 'words'):
+            multiword_check(check, source, state)
+    source.append("    return (True, 'All is well', word_list)")
+    return source
+
+def compile_game(game):
+    """Return the GameRules for a Game.
+
+    Raises ValueError if the game has an unknown check or capitalization.
+    """
+    for check in game.checks:
+        if check not in REASONS:
+            raise ValueError('{}: unknown check "{}"'.format(game.name, check))
+    if game.capitalization not in CAPITALIZATION:
+        raise ValueError('{}: unknown capitalization "{}"'.format(
+            game.name, game.capitalization))
+    if game.letters < 1:
+        raise ValueError('{}: words need at least one letter'.format(game.name))
+
+    first, rest, first_category, rest_category = CAPITALIZATION[game.capitalization]
+    word = '{}{}{{{}}}'.format(first, rest, game.letters - 1)
+    words = '{0}(?:, {0})*'.format(word)
+    namespace = {
+        'categories': categories,
+        'words_re': re.compile(words),
+        'ascii_line_re': re.compile(words.encode()),
+        'category_match': first_category + rest_category * (game.letters - 1),
+        'category_re': re.compile('{}(?:{}){{{}}}'.format(
+            first_category, rest_category, game.letters - 1)),
+    }
+    source = '\n'.join(line_check_source(game) + [''] + bytes_check_source(game) +
+                       [''] + words_source(game)) + '\n'
+    exec(compile(source, '<rules for {}>'.format(game.name), 'exec'), namespace)
+    return GameRules(game, namespace['check_line_words'], namespace['check_bytes_line'],
+                     namespace['words_okay'], source)
+
+@functools.lru_cache(maxsize=None)
+def get_rules(name=DEFAULT_GAME, letters=None):
+    """Return the compiled rules of the game called name in GAMES, with
+    words of letters letters if given.
+
+    The rules are compiled once for each game (in each process).
+    """
+    game = GAMES[name]
+    if letters is not None:
+        game = game._replace(letters=letters)
+    return compile_game(game)
+
+if __name__ == '__main__':
+    import sys
+    for name in sys.argv[1:] or [DEFAULT_GAME]:
+        print(get_rules(name).source)
@@ -0,0 +1,189 @@
+#! /usr/bin/env python3
+"""Report the anagram groups added, extended or removed between snapshots.
+
+Both snapshots are read once, a line at a time, in a single merge pass.
+The lines of a snapshot are in order, so a group whose line is the same in
+both is passed over as soon as the two files reach it.  A group whose line
+changed is keyed by its signature until the same signature turns up in the
+other file, or that file has gone past the last place a line with the
+signature could be (see last_word()); then the group is reported as
+changed, new or removed.  So memory holds the current lines plus only the
+changed groups that have not been placed yet, not the snapshots.
+
+A group split over more than one line of a snapshot (which
+process_data.py --cross_check reports) is compared line by line, so a line
+with more of a group's words shows up as a new or removed group.
+
+Functions:
+    last_word(): Returns the last word, in order, with a signature.
+    group_lines(): Returns the groups of a snapshot, in order.
+    diff_snapshots(): Returns the differences between two snapshots.
+
+When invoked as a command-line program, the differences between two
+snapshot files are written out, as text or as JSON Lines records.
+"""
+
+import sys
+import argparse
+import collections
+import heapq
+import process_data as pd
+
+# A group of a snapshot: its line, the line's first word, its signature
+# and its words.
+Group = collections.namedtuple('Group', ['line', 'first_word', 'signature', 'words'])
+
+def last_word(letters):
+    """Return the capitalized word of the letters that sorts last.
+
+    No line with a first word of these letters can come after a line
+    starting with a greater word, so once a file has gone past this, it
+    holds no more groups with these letters.
+    """
+    return max(letter.upper() + ''.join(sorted(letters.replace(letter, '', 1),
+                                               reverse=True))
+               for letter in set(letters))
+
+def group_lines(filename):
+    """Generator which returns the Group of each data line of a snapshot.
+
+    Lines are read as process_data.py reads them: skipped lines are
+    ignored, and the snapshot ends at an end line.
+    """
+    data_file = pd.open_data_file(filename)
+    try:
+        for line in data_file:
+            line = line.rstrip('\n')
+            verdict = pd.classify_line(line, False)
+            if verdict.kind == pd.SKIP:
+                continue
+            if verdict.kind == pd.END:
+                break
+            words = verdict.words
+            yield Group(line, words[0], pd.signature(words[0]), words)
+    finally:
+        if data_file is not sys.stdin:
+            data_file.close()
+
+def diff_record(old_group, new_group):
+    """Return the records for how a group changed (none if just reordered)."""
+    old_words = {word.casefold() for word in old_group.words}
+    new_words = {word.casefold() for word in new_group.words}
+    added = [word for word in new_group.words if word.casefold() not in old_words]
+    removed = [word for word in old_group.words if word.casefold() not in new_words]
+    records = []
+    if added:
+        records.append({'type': 'added_words', 'signature': new_group.signature,
+                        'group': new_group.words, 'words': added})
+    if removed:
+        records.append({'type': 'removed_words', 'signature': new_group.signature,
+                        'group': new_group.words, 'words': removed})
+    return records
+
+def diff_snapshots(old_groups, new_groups):
+    """Generator which returns a record for each difference between the
+    groups of two snapshots (from group_lines()).
+
+    The records are 'new_group', 'added_words', 'removed_words' and
+    'removed_group', each with the 'signature' of the group, its words in
+    the new snapshot (or old, if removed) as 'group', and for a changed
+    group, the 'words' added or removed.
+    """
+    old_groups = iter(old_groups)
+    new_groups = iter(new_groups)
+    old = next(old_groups, None)
+    new = next(new_groups, None)
+    # Changed groups not yet found in the other snapshot, by signature, and
+    # heaps of (last word, signature) saying when to give up looking.
+    pending = ({}, {})
+    giving_up = ([], [])
+
+    def take(group, side):
+        other = pending[1 - side].pop(group.signature, None)
+        if other is not None:
+            if side == 0:
+                return diff_record(group, other)
+            return diff_record(other, group)
+        mine = pending[side]
+        if group.signature in mine:
+            # The snapshot has the group on two lines; treat them as one.
+            earlier = mine[group.signature]
+            group = earlier._replace(words=earlier.words + [
+                word for word in group.words if word not in earlier.words])
+        else:
+            heapq.heappush(giving_up[side], (last_word(group.signature),
+                                             group.signature))
+        mine[group.signature] = group
+        return []
+
+    def give_up(side, current):
+        """Report pending groups of side the other snapshot, now at
+        current, can no longer have."""
+        records = []
+        heap = giving_up[side]
+        while heap and (current is None or current.first_word > heap[0][0]):
+            _, group_signature = heapq.heappop(heap)
+            group = pending[side].pop(group_signature, None)
+            if group is not None:
+                records.append({'type': 'removed_group' if side == 0 else 'new_group',
+                                'signature': group_signature, 'group': group.words})
+        return records
+
+    while old is not None or new is not None:
+        if old is not None and new is not None and old.line == new.line:
+            old = next(old_groups, None)
+            new = next(new_groups, None)
+        elif new is None or (old is not None and old.line < new.line):
+            yield from take(old, 0)
+            old = next(old_groups, None)
+        else:
+            yield from take(new, 1)
+            new = next(new_groups, None)
+        yield from give_up(0, new)
+        yield from give_up(1, old)
+
+def write_text(record, output):
+    """Write a record of diff_snapshots() as a line of text."""
+    kind = record['type']
+    group = ', '.join(record.get('group', []))
+    if kind == 'new_group':
+        output.write('New group: {}\n'.format(group))
+    elif kind == 'removed_group':
+        output.write('Removed group: {}\n'.format(group))
+    elif kind == 'added_words':
+        output.write('Added to {}: {}\n'.format(group, ', '.join(record['words'])))
+    elif kind == 'removed_words':
+        output.write('Removed from {}: {}\n'.format(group, ', '.join(record['words'])))
+    elif kind == 'summary':
+        output.write('{new_group} new groups, {added_words} words added, '
+                     '{removed_words} words removed, {removed_group} groups '
+                     'removed\n'.format(**record))
+
+def parse_args(args):
+    """Parse command line arguments to the program."""
+    parser = argparse.ArgumentParser(description='Compare two word warp snapshots')
+    parser.add_argument('old', help='The earlier snapshot.')
+    parser.add_argument('new', help='The later snapshot.')
+    parser.add_argument('--format', choices=['text', 'jsonl'], default='text',
+                        help='Output format.')
+    return parser.parse_args(args)
+
+def main(args):
+    if args.format == 'jsonl':
+        import json
+        encode = json.JSONEncoder(ensure_ascii=False).encode
+        write = lambda record, output: output.write(encode(record) + '\n')
+    else:
+        write = write_text
+    counts = collections.Counter()
+    for record in diff_snapshots(group_lines(args.old), group_lines(args.new)):
+        counts[record['type']] += len(record.get('words', [None]))
+        write(record, sys.stdout)
+    summary = {'type': 'summary'}
+    for kind in ('new_group', 'added_words', 'removed_words', 'removed_group'):
+        summary[kind] = counts[kind]
+    write(summary, sys.stdout)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
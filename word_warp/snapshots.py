@@ -0,0 +1,314 @@
+#! /usr/bin/env python3
+"""Store an archive of word warp snapshots as a base file plus deltas.
+
+Each ww_data.YYYY_MM_DD snapshot is mostly the previous one with some lines
+added, so rather than keep every snapshot in full, the archive keeps the
+first snapshot (ww_base.DATE) and, for each later snapshot, the lines
+added and removed since the snapshot before it (ww_delta.DATE).  Any date
+can be materialized again exactly, byte for byte.
+
+A delta is a text file made of hunks:
+    @ START REMOVED ADDED
+    -removed line      (REMOVED of these)
+    +added line        (ADDED of these)
+where START is the index of the first line of the previous snapshot that
+the hunk replaces.  The removed lines are kept so that applying a delta to
+the wrong snapshot is caught, and so a delta can be read on its own.
+
+Functions:
+    read_snapshot(): Returns the lines of a snapshot file.
+    make_delta(): Returns the hunks that turn one snapshot into another.
+    apply_delta(): Applies hunks to the lines of a snapshot.
+    compact(): Writes an archive directory from a list of snapshot files.
+    materialize(): Returns the lines of any date in an archive.
+    check_delta(): Checks only the lines a delta adds, as process_data.py
+        would check them in the materialized snapshot.
+
+When invoked as a command-line program, --compact writes an archive,
+--materialize writes out a snapshot, and --check checks a delta.
+"""
+
+import sys
+import os
+import argparse
+import difflib
+import glob
+import process_data as pd
+
+BASE_PREFIX = 'ww_base.'
+DELTA_PREFIX = 'ww_delta.'
+DATA_PREFIX = 'ww_data.'
+DELTA_HEADER = '# word warp delta\n'
+
+def snapshot_date(filename):
+    """Return the date part (after the last '.') of a snapshot file name."""
+    return os.path.basename(filename).rsplit('.', 1)[-1]
+
+def read_snapshot(filename):
+    """Return the lines of a snapshot file, without their newlines.
+
+    A file ending in a newline has an empty last 'line', so that joining
+    the lines with newlines gives back the exact contents of the file.
+    """
+    with open(filename, newline='') as snapshot_file:
+        return snapshot_file.read().split('\n')
+
+def write_snapshot(lines, output):
+    """Write the lines of a snapshot to an open file."""
+    output.write('\n'.join(lines))
+
+def make_delta(old_lines, new_lines):
+    """Return the hunks that turn old_lines into new_lines.
+
+    Each hunk is a (start, removed lines, added lines) tuple.
+    """
+    matcher = difflib.SequenceMatcher(None, old_lines, new_lines, autojunk=False)
+    hunks = []
+    for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+        if tag != 'equal':
+            hunks.append((old_start, old_lines[old_start:old_end],
+                          new_lines[new_start:new_end]))
+    return hunks
+
+def apply_delta(old_lines, hunks):
+    """Return the lines of the snapshot made by applying hunks to old_lines.
+
+    Raises ValueError if a hunk's removed lines are not in old_lines.
+    """
+    new_lines = []
+    old_index = 0
+    for start, removed, added in hunks:
+        new_lines.extend(old_lines[old_index:start])
+        if old_lines[start:start + len(removed)] != removed:
+            raise ValueError('Delta does not apply at line {}'.format(start + 1))
+        new_lines.extend(added)
+        old_index = start + len(removed)
+    new_lines.extend(old_lines[old_index:])
+    return new_lines
+
+def write_delta(hunks, output):
+    """Write hunks to an open file."""
+    output.write(DELTA_HEADER)
+    for start, removed, added in hunks:
+        output.write('@ {} {} {}\n'.format(start, len(removed), len(added)))
+        for line in removed:
+            output.write('-{}\n'.format(line))
+        for line in added:
+            output.write('+{}\n'.format(line))
+
+def read_delta(filename):
+    """Return the hunks of a delta file."""
+    hunks = []
+    with open(filename, newline='') as delta_file:
+        if delta_file.readline() != DELTA_HEADER:
+            raise ValueError('{}: not a delta file'.format(filename))
+        delta_lines = iter(delta_file.read().split('\n'))
+        for hunk_line in delta_lines:
+            if hunk_line == '':
+                break
+            marker, start, num_removed, num_added = hunk_line.split(' ')
+            if marker != '@':
+                raise ValueError('{}: bad hunk "{}"'.format(filename, hunk_line))
+            removed = [next(delta_lines)[1:] for _ in range(int(num_removed))]
+            added = [next(delta_lines)[1:] for _ in range(int(num_added))]
+            hunks.append((int(start), removed, added))
+    return hunks
+
+def compact(filenames, archive_dir):
+    """Write the snapshot files (oldest first) as an archive directory.
+
+    Returns the names of the files written.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    written = []
+    old_lines = None
+    for filename in filenames:
+        new_lines = read_snapshot(filename)
+        date = snapshot_date(filename)
+        if old_lines is None:
+            out_name = os.path.join(archive_dir, BASE_PREFIX + date)
+            with open(out_name, 'w', newline='') as output:
+                write_snapshot(new_lines, output)
+        else:
+            out_name = os.path.join(archive_dir, DELTA_PREFIX + date)
+            with open(out_name, 'w', newline='') as output:
+                write_delta(make_delta(old_lines, new_lines), output)
+        written.append(out_name)
+        old_lines = new_lines
+    return written
+
+def archive_files(archive_dir):
+    """Return (base file, list of delta files in date order) of an archive."""
+    bases = glob.glob(os.path.join(archive_dir, BASE_PREFIX + '*'))
+    if len(bases) != 1:
+        raise ValueError('{}: expected one base file, found {}'.format(
+            archive_dir, len(bases)))
+    deltas = sorted(glob.glob(os.path.join(archive_dir, DELTA_PREFIX + '*')),
+                    key=snapshot_date)
+    return bases[0], deltas
+
+def materialize(archive_dir, date, with_hunks=False):
+    """Return the lines of the snapshot for date from an archive.
+
+    With with_hunks, return (lines of the snapshot before date, hunks of
+    the delta for date) instead, for check_delta().
+    """
+    base, deltas = archive_files(archive_dir)
+    lines = read_snapshot(base)
+    if snapshot_date(base) == date:
+        if with_hunks:
+            return [], make_delta([], lines)
+        return lines
+    for delta in deltas:
+        hunks = read_delta(delta)
+        if snapshot_date(delta) == date:
+            if with_hunks:
+                return lines, hunks
+            return apply_delta(lines, hunks)
+        lines = apply_delta(lines, hunks)
+    raise ValueError('{}: no snapshot for {}'.format(archive_dir, date))
+
+def is_end_line(line):
+    """Return whether a line ends the data of a snapshot."""
+    return not pd.SKIP_RE.search(line) and pd.END_RE.search(line) is not None
+
+def is_data_line(line):
+    """Return whether a line is data (neither skipped nor an end line)."""
+    return not pd.SKIP_RE.search(line) and not pd.END_RE.search(line)
+
+def check_delta(old_lines, hunks, filename, args, report):
+    """Check the lines a delta adds to a snapshot.
+
+    Only the added lines are classified; the lines kept from the old
+    snapshot were checked when it was.  Each added line is checked to come
+    after the data line before it, and the data lines kept after a hunk to
+    come after the hunk (which stops at the first that does), so the order
+    of the new snapshot is checked just where it changed.  Hunks after the
+    end line are ignored, as process_data.py ignores the lines there.  If a
+    hunk removes the end line, though, the old lines kept between it and
+    the next end line become data, so they are checked in full.  Line
+    numbers are those of the new snapshot, and records go to report() as
+    from pd.check_file().
+    Returns True if the added lines are good.
+    """
+    def next_end(index):
+        for end in range(index, len(old_lines)):
+            if is_end_line(old_lines[end]):
+                return end
+        return len(old_lines)
+
+    def check_line(line, lineno):
+        """Check a line not checked before; return whether it is an end line."""
+        nonlocal succeeded, last_good_line
+        verdict = pd.classify_line(line, args.debug_program)
+        if verdict.kind == pd.END:
+            return True
+        if verdict.kind == pd.BAD:
+            succeeded = False
+            report(pd.line_record('bad', filename, lineno, line,
+                                  reason=verdict.reason))
+        elif verdict.kind == pd.SKIP:
+            pass
+        elif not line > last_good_line:
+            succeeded = False
+            report(pd.line_record('bad', filename, lineno, line,
+                                  reason=pd.OUT_OF_ORDER, after=last_good_line))
+        else:
+            last_good_line = line
+        return False
+
+    def check_kept(stop):
+        """Check the old lines kept from old_index up to stop."""
+        nonlocal succeeded, last_good_line
+        checked_stop = min(stop, checked_end)
+        # The kept lines are in order, so once one comes after the lines
+        # before it, so do the rest.
+        for index in range(old_index, checked_stop):
+            line = old_lines[index]
+            if is_data_line(line):
+                if line > last_good_line:
+                    break
+                succeeded = False
+                report(pd.line_record('bad', filename, index + offset + 1,
+                                      line, reason=pd.OUT_OF_ORDER,
+                                      after=last_good_line))
+        for index in range(checked_stop - 1, old_index - 1, -1):
+            if is_data_line(old_lines[index]):
+                last_good_line = max(last_good_line, old_lines[index])
+                break
+        for index in range(max(old_index, checked_end), stop):
+            check_line(old_lines[index], index + offset + 1)
+
+    succeeded = True
+    last_good_line = ''
+    # Old lines before checked_end were checked with the old snapshot.
+    checked_end = next_end(0)
+    old_end = checked_end
+    old_index = 0
+    offset = 0  # The new line number of an old line, less its old one.
+    for start, removed, added in hunks:
+        if old_end < start:
+            break
+        check_kept(start)
+        for lineno, line in enumerate(added, start + offset + 1):
+            if check_line(line, lineno):
+                return succeeded
+        old_index = start + len(removed)
+        offset += len(added) - len(removed)
+        if old_end < old_index:
+            old_end = next_end(old_index)
+    check_kept(old_end)
+    return succeeded
+
+def parse_args(args):
+    """Parse command line arguments to the program."""
+    parser = argparse.ArgumentParser(description='Word warp snapshot archive')
+    parser.add_argument('--archive', '-a', required=True,
+                        help='Archive directory.')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--compact', '-c', nargs='+', metavar='SNAPSHOT',
+                        help='Write these snapshot files (in date order) to '
+                             'the archive.')
+    action.add_argument('--materialize', '-m', metavar='DATE',
+                        help='Write out the snapshot for DATE.')
+    action.add_argument('--check', '-k', metavar='DATE',
+                        help='Check the lines added by the delta for DATE.')
+    parser.add_argument('--output', '-o',
+                        help='File to materialize to (default: standard output).')
+    parser.add_argument('--debug_program', '-D', action='store_true',
+                        help='Program debug mode.')
+    parser.add_argument('--format', choices=['text', 'jsonl'], default='text',
+                        help='Output format for --check.')
+    parser.add_argument('--verbose', '-v', action='store_true',
+                        help='Verbose: show each file written.')
+    args = parser.parse_args(args)
+    # Settings the process_data.py writers look at.
+    args.stats = False
+    return args
+
+def main(args):
+    if args.compact:
+        filenames = sorted(args.compact, key=snapshot_date)
+        for out_name in compact(filenames, args.archive):
+            if args.verbose:
+                print('Wrote "{}" ({} bytes)'.format(out_name, os.path.getsize(out_name)))
+        return 0
+
+    if args.materialize:
+        lines = materialize(args.archive, args.materialize)
+        if args.output:
+            with open(args.output, 'w', newline='') as output:
+                write_snapshot(lines, output)
+        else:
+            write_snapshot(lines, sys.stdout)
+        return 0
+
+    old_lines, hunks = materialize(args.archive, args.check, with_hunks=True)
+    writer = pd.make_writer(args)
+    succeeded = check_delta(old_lines, hunks, DATA_PREFIX + args.check, args,
+                            writer.write)
+    writer.stream.flush()
+    return 0 if succeeded else 1
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
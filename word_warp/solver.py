@@ -0,0 +1,143 @@
+#! /usr/bin/env python3
+"""Solve and practice word warp racks with the words of the latest snapshot.
+
+Given a rack of letters, the solver returns every word in the data that can
+be made from at least --min_length (3) of them, longest first.  The words
+come from an AnagramIndex of the latest snapshot (or a saved index), so
+each rack is a few dictionary lookups: one per distinct set of its letters
+of a length the index has words of.  The snapshots hold only 6-letter
+words, so in practice that is a single lookup.
+
+Functions:
+    latest_snapshot(): Returns the name of the latest of some snapshot files.
+    load_rack_index(): Returns the index to solve racks with.
+    solve(): Returns the words that can be made from a rack.
+    answer_racks(): Writes the words for each of a list of racks.
+    train(): Asks the user for the words of random racks, and scores them.
+
+When invoked as a command-line program, the racks given on the command line
+are solved.  With no racks (or "-"), racks are read one per line from
+standard input, so the index is loaded once for any number of racks.  With
+--train N, the user is given N racks to solve instead.
+"""
+
+import sys
+import argparse
+import glob
+import random
+import process_data as pd
+import anagram_index as ai
+import snapshots
+
+MIN_LENGTH = 3
+
+def latest_snapshot(filenames):
+    """Return the snapshot with the latest date, or None if there are none."""
+    if not filenames:
+        return None
+    return max(filenames, key=snapshots.snapshot_date)
+
+def load_rack_index(args):
+    """Return the index to solve racks with: --index, or one built from
+    --snapshot."""
+    if args.index:
+        return ai.load_index(args.index)
+    index = ai.AnagramIndex()
+    index.add_file(args.snapshot)
+    return index
+
+def solve(index, rack, min_length=MIN_LENGTH):
+    """Return the words of index that can be made from letters of rack."""
+    return index.sub_anagrams(rack, min_length)
+
+def answer_racks(index, racks, output, min_length=MIN_LENGTH):
+    """Write a line with the words for each rack to output.
+
+    Blank racks are skipped, and racks that are not all letters are
+    reported as such.
+    """
+    for rack in racks:
+        rack = rack.strip()
+        if not rack:
+            continue
+        if not rack.isalpha():
+            output.write('{}: not letters\n'.format(rack))
+            continue
+        output.write('{}: {}\n'.format(rack, ', '.join(solve(index, rack, min_length))))
+
+def train(index, rounds, rng, ask=input, output=print, min_length=MIN_LENGTH):
+    """Give the user rounds racks to find the words of, and score them.
+
+    Each rack is the shuffled letters of a random anagram group of the
+    longest words in the index.  The user answers with the words found,
+    separated by commas; a blank answer ends training.
+    Returns (words found, words there were to find).
+    """
+    longest = max(index.lengths, default=0)
+    rack_signatures = sorted(group_signature for group_signature in index.groups
+                             if len(group_signature) == longest)
+    found_total = 0
+    words_total = 0
+    for _ in range(rounds if rack_signatures else 0):
+        letters = list(rng.choice(rack_signatures))
+        rng.shuffle(letters)
+        rack = ''.join(letters).upper()
+        answer = ask('Rack {} -> '.format(rack))
+        if not answer.strip():
+            break
+        words = solve(index, rack, min_length)
+        guesses = {word.casefold() for word in pd.get_words(answer) if word}
+        found = [word for word in words if word.casefold() in guesses]
+        missed = [word for word in words if word.casefold() not in guesses]
+        known = {word.casefold() for word in words}
+        wrong = sorted(guess for guess in guesses if guess not in known)
+        output('Found {} of {}: {}'.format(len(found), len(words), ', '.join(found)))
+        if missed:
+            output('Missed: {}'.format(', '.join(missed)))
+        if wrong:
+            output('Not in the data: {}'.format(', '.join(wrong)))
+        found_total += len(found)
+        words_total += len(words)
+    return found_total, words_total
+
+def parse_args(args):
+    """Parse command line arguments to the program."""
+    parser = argparse.ArgumentParser(description='Solve word warp racks')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--snapshot', '-f',
+                        help='Data file to take the words from (default: the '
+                             'latest ww_data.* file).')
+    source.add_argument('--index', '-x',
+                        help='Saved index (from anagram_index.py --save) to load.')
+    parser.add_argument('--min_length', '-l', type=int, default=MIN_LENGTH,
+                        help='Shortest words to find.')
+    parser.add_argument('--train', '-t', type=int, metavar='ROUNDS',
+                        help='Practice: solve this many random racks.')
+    parser.add_argument('--seed', type=int,
+                        help='Random seed for --train.')
+    parser.add_argument('racks', nargs='*',
+                        help='Racks of letters to solve ("-" or none: read '
+                             'them from standard input).')
+    args = parser.parse_args(args)
+    if not args.index and not args.snapshot:
+        args.snapshot = latest_snapshot(glob.glob('ww_data.*'))
+        if args.snapshot is None:
+            parser.error('no ww_data.* files here; give one with --snapshot')
+    return args
+
+def main(args):
+    index = load_rack_index(args)
+    if args.train:
+        found, total = train(index, args.train, random.Random(args.seed),
+                             min_length=args.min_length)
+        print('Found {} of {} words'.format(found, total))
+        return 0
+
+    racks = args.racks
+    if not racks or racks == ['-']:
+        racks = sys.stdin
+    answer_racks(index, racks, sys.stdout, args.min_length)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(parse_args(sys.argv[1:])))
@@ -0,0 +1,71 @@
+#! /usr/bin/env python3
+"""Test cases for anagram_index.py."""
+
+import os
+import shutil
+import tempfile
+import unittest
+import anagram_index as ai
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+class TestAnagramIndex(unittest.TestCase):
+    """A class for testing the anagram index"""
+
+    def setUp(self):
+        self.index = ai.AnagramIndex()
+        self.index.add_file(os.path.join(DATA_DIR, 'test_input'))
+
+    def test_signature(self):
+        """Signature"""
+        self.assertEqual(ai.signature('Wither'), 'ehirtw')
+        self.assertEqual(ai.signature('Writhe'), ai.signature('wHITER'))
+
+    def test_lookup(self):
+        """Lookup"""
+        self.assertEqual(self.index.lookup('rehtiw'), ['Whiter', 'Wither', 'Writhe'])
+        self.assertEqual(self.index.lookup('NGISDE'),
+                         ['Deigns', 'Design', 'Signed', 'Singed'])
+        self.assertEqual(self.index.lookup('Zzzzzz'), [])
+
+    def test_bad_lines_left_out(self):
+        """Bad lines and lines after the end are not indexed"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, 'data')
+            with open(filename, 'w') as data_file:
+                data_file.write('Word warp\n\nAllure, Laurel\nSeduce, Deuces\n'
+                                'Wintry\n---\nWithal\n')
+            index = ai.AnagramIndex()
+            index.add_file(filename)
+        finally:
+            shutil.rmtree(tmp_dir)
+        self.assertEqual(sorted(index.groups), ['aellru', 'inrtwy'])
+        self.assertEqual(index.lookup('Deuces'), [])
+        self.assertEqual(index.lookup('Withal'), [])
+
+    def test_sub_anagrams(self):
+        """Sub-anagrams"""
+        index = ai.AnagramIndex()
+        for line in ['Ate, Eat, Tea', 'At', 'Eats, Seat', 'Sat', 'Zoo']:
+            index.add_line(line)
+        self.assertEqual(index.sub_anagrams('tsea'),
+                         ['Eats', 'Seat', 'Ate', 'Eat', 'Tea', 'Sat', 'At'])
+        self.assertEqual(index.sub_anagrams('tsea', min_length=3),
+                         ['Eats', 'Seat', 'Ate', 'Eat', 'Tea', 'Sat'])
+        self.assertEqual(index.sub_anagrams('xyz'), [])
+
+    def test_save_and_load(self):
+        """Saved index loads back the same"""
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, 'index')
+            self.index.save(filename)
+            loaded = ai.load_index(filename)
+        finally:
+            shutil.rmtree(tmp_dir)
+        self.assertEqual(loaded.groups, self.index.groups)
+        self.assertEqual(len(loaded), 1632)
+
+if __name__ == '__main__':
+    unittest.main()
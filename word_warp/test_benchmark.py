@@ -0,0 +1,57 @@
+#! /usr/bin/env python3
+"""Test cases for the synthetic data and baseline checks of benchmark.py."""
+
+import unittest
+import process_data as pd
+import benchmark
+
+class TestBenchmark(unittest.TestCase):
+    """A class for testing the benchmark suite's helpers"""
+
+    def check_lines(self, lines):
+        """Return the number of lines that are good and in order."""
+        good = 0
+        last_good_line = ''
+        for line in lines:
+            if pd.line_is_good(line, False)[0] and line > last_good_line:
+                good += 1
+                last_good_line = line
+        return good
+
+    def test_good_lines(self):
+        """With no bad lines, every synthetic line is good and in order"""
+        lines = list(benchmark.synthetic_lines(2000, unicode=0.5, anagrams=0.5))
+        self.assertEqual(self.check_lines(lines), 2000)
+        self.assertTrue(any(not line.isascii() for line in lines))
+        self.assertTrue(any(', ' in line for line in lines))
+
+    def test_plain_lines(self):
+        """With no mix, the lines are single ASCII words"""
+        lines = list(benchmark.synthetic_lines(100))
+        self.assertEqual(lines[:3], ['Aaaaaa', 'Aaaaab', 'Aaaaac'])
+        self.assertTrue(all(line.isascii() and ', ' not in line for line in lines))
+
+    def test_bad_lines(self):
+        """About the asked-for fraction of lines is bad, the same each time"""
+        lines = list(benchmark.synthetic_lines(2000, unicode=0.2, anagrams=0.2,
+                                               bad=0.25, seed=3))
+        self.assertEqual(lines, list(benchmark.synthetic_lines(
+            2000, unicode=0.2, anagrams=0.2, bad=0.25, seed=3)))
+        self.assertGreater(self.check_lines(lines), 1300)
+        self.assertLess(self.check_lines(lines), 1700)
+
+    def test_find_regressions(self):
+        """Slower lines and more memory are regressions; a little is not"""
+        baseline = {'words_okay': {'lines_per_sec': 1000},
+                    'process_files': {'lines_per_sec': 100, 'peak_bytes': 1000}}
+        self.assertEqual(benchmark.find_regressions(
+            {'words_okay': {'lines_per_sec': 900},
+             'process_files': {'lines_per_sec': 120, 'peak_bytes': 1100},
+             'new_check': {'lines_per_sec': 1}}, baseline, 0.2), [])
+        self.assertEqual(len(benchmark.find_regressions(
+            {'words_okay': {'lines_per_sec': 700},
+             'process_files': {'lines_per_sec': 100, 'peak_bytes': 1300}},
+            baseline, 0.2)), 2)
+
+if __name__ == '__main__':
+    unittest.main()
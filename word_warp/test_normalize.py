@@ -0,0 +1,69 @@
+#! /usr/bin/env python3
+"""Test cases for normalize.py."""
+
+import io
+import os
+import random
+import contextlib
+import tempfile
+import unittest
+import process_data as pd
+import normalize
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+class TestNormalize(unittest.TestCase):
+    """A class for testing the raw transcript normalizer"""
+
+    def test_external_sort(self):
+        """External sort with several runs sorts everything"""
+        items = ['{:05}'.format(random.randrange(100000)) for _ in range(1000)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.assertEqual(list(normalize.external_sort(iter(items), 64, tmp_dir)),
+                             sorted(items))
+            self.assertEqual(os.listdir(tmp_dir), [])
+            self.assertEqual(list(normalize.external_sort(iter(items), 5000, tmp_dir)),
+                             sorted(items))
+            self.assertEqual(list(normalize.external_sort(iter([]), 10, tmp_dir)), [])
+
+    def test_buffer_lines(self):
+        """At least one line has to be sorted in memory at once"""
+        with contextlib.redirect_stderr(io.StringIO()):
+            for buffer_lines in ('0', '-5'):
+                self.assertRaises(SystemExit, normalize.parse_args, ['-b', buffer_lines])
+        self.assertEqual(normalize.parse_args(['-b', '1']).buffer_lines, 1)
+
+    def test_normalize(self):
+        """Words are grouped, sorted and deduplicated"""
+        words = ['Writhe', 'Esteem', 'Wither', 'Saddle', 'Action', 'Whiter',
+                 'Addles', 'Esteem', 'Éclair', 'Eclair']
+        for buffer_lines in (2, 100):
+            self.assertEqual(list(normalize.normalize(iter(words), buffer_lines)),
+                             ['Action', 'Addles, Saddle', 'Eclair', 'Esteem',
+                              'Whiter, Wither, Writhe', 'Éclair'])
+
+    def test_transcript_words(self):
+        """Only good words before the end line are taken"""
+        records = []
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'raw')
+            with open(filename, 'w') as raw_file:
+                raw_file.write('Word warp\n\nWither,Whiter\nWinTry\n---\nAction\n')
+            words = list(normalize.transcript_words([filename], records.append))
+        self.assertEqual(words, ['Wither', 'Whiter'])
+        self.assertEqual([(record['line_number'], record['reason']) for record in records],
+                         [(4, 'Dropped "WinTry"')])
+
+    def test_raw_transcript(self):
+        """The normalized raw transcript passes all the checks"""
+        filename = os.path.join(DATA_DIR, 'raw_ww_data.2019_06_14')
+        words = normalize.transcript_words([filename], self.fail)
+        lines = list(normalize.normalize(words, buffer_lines=500))
+        self.assertEqual(lines, sorted(set(lines)))
+        cross_check = pd.CrossCheck('normalized')
+        for lineno, line in enumerate(lines, 1):
+            self.assertEqual(pd.line_is_good(line, False), (True, 'All is well'), line)
+            self.assertIsNone(cross_check.check(lineno, pd.get_words(line)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+#! /usr/bin/env python3
+"""Test cases for rules.py."""
+
+import glob
+import io
+import os
+import contextlib
+import unittest
+import process_data as pd
+import rules
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+EDGE_LINES = ["Action", "Addles, Saddle", "Whiter, Writhe, Wither", "Wintry,Withal",
+              "Wintry, Withal", "WinTry", "Wintry ", " Wintry", "Wintry, , Withal",
+              "", "Abcdef, ", "Ébauche", "Éclair, Eclair", "Écrasé", "Deuces, Seduce, seduce"]
+
+class TestRules(unittest.TestCase):
+    """A class for testing the compiled game rules"""
+
+    def step_by_step(self, line):
+        """Check a word warp line one step at a time, with line_space_okay()
+        and the others, as line_is_good() once did."""
+        word_list = pd.get_words(line)
+        if not pd.line_space_okay(line, False):
+            return (False, 'Bad whitespace.', word_list)
+        if not all(rules.categories(word) == 'Lu' + 'Ll'*5 for word in word_list):
+            return (False, 'Did not parse.', word_list)
+        folded_list = [word.casefold() for word in word_list]
+        if not pd.words_are_anagrams(folded_list, False):
+            return (False, 'Not anagrams', word_list)
+        if not pd.words_are_alphabetic(folded_list, False):
+            return (False, 'Not alphabetic', word_list)
+        return (True, 'All is well', word_list)
+
+    def test_word_warp_matches(self):
+        """Compiled word warp rules agree with the separate checks"""
+        check_line_words = rules.get_rules().check_line_words
+        words_okay = rules.get_rules().words_okay
+        lines = list(EDGE_LINES)
+        for filename in glob.glob(os.path.join(DATA_DIR, '*')):
+            with open(filename) as data_file:
+                lines.extend(line.rstrip('\n') for line in data_file)
+        for line in lines:
+            expected = self.step_by_step(line)
+            self.assertEqual(check_line_words(line, False), expected, line)
+            self.assertEqual(pd.check_line_words(line, False), expected, line)
+            if pd.line_space_okay(line, False):
+                self.assertEqual(words_okay(pd.get_words(line), False),
+                                 expected[1] != 'Did not parse.', line)
+
+    def test_bytes_matches(self):
+        """Bytes checks agree with text checks, or leave the line to them"""
+        for name in sorted(rules.GAMES):
+            game_rules = rules.get_rules(name)
+            for line in EDGE_LINES + ['Acres, Cares, Races, Scare', 'Abcdefg, Gfedcba']:
+                result = game_rules.check_bytes_line(line.encode(), False)
+                if result is not None:
+                    good, reason, word_list = result
+                    self.assertEqual((good, reason),
+                                     game_rules.check_line_words(line, False)[:2],
+                                     (name, line))
+
+    def test_word_lengths(self):
+        """Other games check words of their own length"""
+        five = rules.get_rules('word_warp_5').check_line_words
+        seven = rules.get_rules('word_warp', 7).check_line_words
+        self.assertEqual(five('Acres, Cares, Races, Scare', False)[:2], (True, 'All is well'))
+        self.assertEqual(five('Action', False)[:2], (False, 'Did not parse.'))
+        self.assertEqual(seven('Harmful', False)[:2], (True, 'All is well'))
+        self.assertEqual(seven('Ésprits', False)[:2], (True, 'All is well'))
+        self.assertEqual(seven('Action', False)[:2], (False, 'Did not parse.'))
+
+    def test_policies_and_checks(self):
+        """Capitalization policies and lists of checks are followed"""
+        lower = rules.compile_game(rules.Game('lower', 4, 'lower', rules.CHECKS))
+        self.assertTrue(lower.check_line_words('opts, post, pots, spot, stop', False)[0])
+        self.assertFalse(lower.check_line_words('Spot', False)[0])
+        self.assertIsNotNone(lower.check_bytes_line(b'post, spot', False))
+        any_case = rules.compile_game(rules.Game('any', 4, 'any', rules.CHECKS))
+        self.assertTrue(any_case.check_line_words('POST, spot', False)[0])
+        self.assertTrue(any_case.check_line_words('tabé, Ébat', False)[0])
+        unordered = rules.compile_game(rules.Game('unordered', 6, 'capitalized',
+                                                  ('whitespace', 'words', 'anagrams')))
+        self.assertTrue(unordered.check_line_words('Saddle, Addles', False)[0])
+        self.assertEqual(unordered.check_bytes_line(b'Saddle, Addles', False)[0], True)
+        anagrams_first = rules.compile_game(rules.Game('first', 6, 'capitalized',
+                                                       ('anagrams', 'words')))
+        self.assertEqual(anagrams_first.check_line_words('abcdef, Xyzzyz', False)[1],
+                         'Not anagrams')
+        long_words = rules.get_rules('word_warp', 8)
+        self.assertIsNone(long_words.check_bytes_line(b'Wordwarp', False))
+
+    def test_bad_games(self):
+        """Unknown checks and policies are refused"""
+        with self.assertRaises(ValueError):
+            rules.compile_game(rules.Game('bad', 6, 'capitalized', ('spelling',)))
+        with self.assertRaises(ValueError):
+            rules.compile_game(rules.Game('bad', 6, 'title', rules.CHECKS))
+        with self.assertRaises(ValueError):
+            rules.compile_game(rules.Game('bad', 0, 'capitalized', rules.CHECKS))
+
+    def test_arguments(self):
+        """Words need a letter, and --fix takes only word warp's rules"""
+        with contextlib.redirect_stderr(io.StringIO()):
+            for arg_list in (['-l', '0'], ['-l', '-1'], ['--fix', '-l', '5'],
+                             ['--fix', '-g', 'word_warp_5']):
+                self.assertRaises(SystemExit, pd.parse_args, arg_list + ['-f', 'data'])
+        self.assertTrue(pd.parse_args(['--fix', '-l', '6', '-f', 'data']).fix)
+        self.assertTrue(pd.parse_args(['--fix', '-g', 'word_warp', '-l', '6',
+                                       '-f', 'data']).fix)
+
+    def test_process_files(self):
+        """process_data.py checks files with the chosen game's rules"""
+        args = pd.parse_args(['-g', 'word_warp_5', '-f', 'data'])
+        game_rules = pd.game_rules(args)
+        self.assertEqual(pd.classify_bytes_line(b'Cares, Races', False, game_rules).kind,
+                         pd.GOOD)
+        self.assertEqual(pd.classify_bytes_line(b'Action', False, game_rules).kind, pd.BAD)
+        self.assertEqual(pd.classify_line('Word warp', False, game_rules.check_line_words),
+                         pd.Verdict(pd.SKIP, 'Skipped', None))
+
+if __name__ == '__main__':
+    unittest.main()
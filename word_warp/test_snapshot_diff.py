@@ -0,0 +1,102 @@
+#! /usr/bin/env python3
+"""Test cases for snapshot_diff.py."""
+
+import glob
+import os
+import tempfile
+import unittest
+import snapshot_diff as sd
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def set_diff(old_file, new_file):
+    """Return the changes between two snapshots, from both loaded in full,
+    and the signatures of groups split over more than one line."""
+    split = set()
+    def load(filename):
+        groups = {}
+        for group in sd.group_lines(filename):
+            if group.signature in groups:
+                split.add(group.signature)
+            groups[group.signature] = {word.casefold() for word in group.words}
+        return groups
+    old, new = load(old_file), load(new_file)
+    changes = set()
+    for group_signature in (old.keys() | new.keys()) - split:
+        old_words = old.get(group_signature)
+        new_words = new.get(group_signature)
+        if old_words is None:
+            changes.add(('new_group', group_signature, None))
+        elif new_words is None:
+            changes.add(('removed_group', group_signature, None))
+        else:
+            if new_words - old_words:
+                changes.add(('added_words', group_signature,
+                             frozenset(new_words - old_words)))
+            if old_words - new_words:
+                changes.add(('removed_words', group_signature,
+                             frozenset(old_words - new_words)))
+    return changes, split
+
+def as_changes(records):
+    """Return diff_snapshots() records in the form of set_diff()."""
+    return {(record['type'], record['signature'],
+             frozenset(word.casefold() for word in record['words'])
+             if 'words' in record else None)
+            for record in records}
+
+class TestSnapshotDiff(unittest.TestCase):
+    """A class for testing snapshot comparison"""
+
+    def diff(self, old_lines, new_lines):
+        """Return the records for snapshots of the given lines."""
+        with tempfile.TemporaryDirectory() as directory:
+            filenames = []
+            for name, lines in (('old', old_lines), ('new', new_lines)):
+                filename = os.path.join(directory, name)
+                with open(filename, 'w') as data_file:
+                    data_file.write('\n'.join(['Word warp'] + lines +
+                                              ['---', 'Ignored']) + '\n')
+                filenames.append(filename)
+            return list(sd.diff_snapshots(*map(sd.group_lines, filenames)))
+
+    def test_last_word(self):
+        """The last word of some letters sorts after all the others"""
+        self.assertEqual(sd.last_word('addels'), 'Sledda')
+        self.assertEqual(sd.last_word('aabdes'), 'Sedbaa')
+        self.assertGreater(sd.last_word('abcdeé'), 'Zzzzzz')
+
+    def test_changes(self):
+        """Groups that moved, grew, shrank, came and went are all found"""
+        records = self.diff(['Abased', 'Nudity, Untidy', 'Saddle',
+                             'Whiter, Wither', 'Wintry'],
+                            ['Abased', 'Action', 'Addles, Saddle', 'Untidy',
+                             'Whiter, Wither, Writhe'])
+        self.assertEqual(sorted((record['type'], record.get('words'))
+                                for record in records),
+                         [('added_words', ['Addles']), ('added_words', ['Writhe']),
+                          ('new_group', None), ('removed_group', None),
+                          ('removed_words', ['Nudity'])])
+        self.assertEqual(self.diff(['Addles, Saddle'], ['Saddle']),
+                         [{'type': 'removed_words', 'signature': 'addels',
+                           'group': ['Saddle'], 'words': ['Addles']}])
+        self.assertEqual(self.diff(['Wintry'], ['Wintry']), [])
+
+    def test_split_groups(self):
+        """A group split over two lines is compared line by line"""
+        self.assertEqual(self.diff(['Nudity, Untidy'], ['Nudity, Untidy', 'Untidy']),
+                         [{'type': 'new_group', 'signature': 'dintuy',
+                           'group': ['Untidy']}])
+
+    def test_snapshots(self):
+        """Every pair of snapshots differs as when both are loaded in full"""
+        filenames = sorted(glob.glob(os.path.join(DATA_DIR, 'ww_data.*')))
+        for old_file, new_file in zip(filenames, filenames[1:] + filenames[:1]):
+            changes, split = set_diff(old_file, new_file)
+            records = [record for record in
+                       sd.diff_snapshots(sd.group_lines(old_file), sd.group_lines(new_file))
+                       if record['signature'] not in split]
+            self.assertEqual(as_changes(records), changes, (old_file, new_file))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+#! /usr/bin/env python3
+"""Test cases for snapshots.py."""
+
+import os
+import glob
+import shutil
+import tempfile
+import unittest
+import process_data as pd
+import snapshots
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+OLD_SNAPSHOT = 'Word warp\n\nAction\nEsteem\nWintry\n———\nBad, Stuff\n'
+
+class TestSnapshots(unittest.TestCase):
+    """A class for testing the snapshot archive"""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.archive = os.path.join(self.tmp_dir, 'archive')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_snapshots(self, *contents):
+        """Write snapshot files with the given contents; return their names."""
+        filenames = []
+        for day, content in enumerate(contents, 1):
+            filename = os.path.join(self.tmp_dir, 'ww_data.2019_01_{:02}'.format(day))
+            with open(filename, 'w', newline='') as snapshot_file:
+                snapshot_file.write(content)
+            filenames.append(filename)
+        return filenames
+
+    def check(self, new_snapshot):
+        """Check the delta to new_snapshot; return (succeeded, records)."""
+        snapshots.compact(self.write_snapshots(OLD_SNAPSHOT, new_snapshot),
+                          self.archive)
+        old_lines, hunks = snapshots.materialize(self.archive, '2019_01_02',
+                                                 with_hunks=True)
+        records = []
+        args = pd.parse_args([])
+        succeeded = snapshots.check_delta(old_lines, hunks, 'new', args,
+                                          records.append)
+        return succeeded, records
+
+    def test_round_trip(self):
+        """Every archived snapshot materializes exactly"""
+        filenames = sorted(glob.glob(os.path.join(DATA_DIR, 'ww_data.*')))
+        written = snapshots.compact(filenames, self.archive)
+        self.assertEqual(len(written), len(filenames))
+        self.assertLess(sum(os.path.getsize(name) for name in written),
+                        sum(os.path.getsize(name) for name in filenames) / 4)
+        for filename in filenames:
+            with open(filename, newline='') as snapshot_file:
+                expected = snapshot_file.read()
+            lines = snapshots.materialize(self.archive, snapshots.snapshot_date(filename))
+            self.assertEqual('\n'.join(lines), expected, filename)
+
+    def test_delta_does_not_apply(self):
+        """A delta applied to the wrong snapshot is caught"""
+        hunks = snapshots.make_delta(['A', 'B', 'C'], ['A', 'C'])
+        self.assertEqual(hunks, [(1, ['B'], [])])
+        with self.assertRaises(ValueError):
+            snapshots.apply_delta(['A', 'X', 'C'], hunks)
+
+    def test_good_delta(self):
+        """A delta adding good lines in order checks out"""
+        succeeded, records = self.check(
+            'Word warp\n\nAction\nAddles, Saddle\nEsteem\nMacaws\nWintry\n———\n')
+        self.assertTrue(succeeded)
+        self.assertEqual(records, [])
+
+    def test_bad_delta(self):
+        """Bad and misplaced added lines are reported with new line numbers"""
+        succeeded, records = self.check(
+            'Word warp\n\nAction\nMacaws\nEsteem\nWintry\nWiNtry\n———\nMore, Bad\n')
+        self.assertFalse(succeeded)
+        self.assertEqual([(record['line_number'], record['reason']) for record in records],
+                         [(5, pd.OUT_OF_ORDER), (7, 'Did not parse.')])
+
+    def test_kept_lines_out_of_order(self):
+        """Kept lines are reported until one comes after the added lines"""
+        succeeded, records = self.check(
+            'Word warp\n\nMacaws\nAction\nEsteem\nWintry\n———\n')
+        self.assertFalse(succeeded)
+        self.assertEqual([(record['line_number'], record['after']) for record in records],
+                         [(4, 'Macaws'), (5, 'Macaws')])
+
+    def test_end_line_removed(self):
+        """Old lines after a removed end line are checked as data"""
+        succeeded, records = self.check(
+            'Word warp\n\nAction\nEsteem\nWintry\nZircon\nBad, Stuff\n')
+        self.assertFalse(succeeded)
+        self.assertEqual([(record['line_number'], record['reason']) for record in records],
+                         [(7, 'Did not parse.')])
+        succeeded, records = self.check(
+            'Word warp\n\nAction\nEsteem\nWintry\nZircon\nBad, Stuff\n———\n')
+        self.assertFalse(succeeded)
+        self.assertEqual(len(records), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+#! /usr/bin/env python3
+"""Test cases for solver.py."""
+
+import io
+import os
+import random
+import unittest
+import anagram_index as ai
+import solver
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+class TestSolver(unittest.TestCase):
+    """A class for testing the rack solver and trainer"""
+
+    def setUp(self):
+        self.index = ai.AnagramIndex()
+        self.index.add_file(os.path.join(DATA_DIR, 'test_input'))
+        self.index.add_words(['Ate', 'Eat', 'Tea'])
+
+    def test_latest_snapshot(self):
+        """The latest snapshot is found by date, not by directory"""
+        self.assertEqual(solver.latest_snapshot(
+            ['b/ww_data.2019_07_30', 'a/ww_data.2019_08_03', 'c/ww_data.2019_06_09']),
+            'a/ww_data.2019_08_03')
+        self.assertIsNone(solver.latest_snapshot([]))
+
+    def test_solve(self):
+        """Words of 3 or more letters are found, longest first"""
+        self.assertEqual(solver.solve(self.index, 'wither'),
+                         ['Whiter', 'Wither', 'Writhe'])
+        self.assertEqual(solver.solve(self.index, 'ETAXYZ'), ['Ate', 'Eat', 'Tea'])
+        self.assertEqual(solver.solve(self.index, 'ETAXYZ', min_length=4), [])
+
+    def test_answer_racks(self):
+        """Each rack gets a line; bad racks say so"""
+        output = io.StringIO()
+        solver.answer_racks(self.index, ['rehtiw\n', '\n', 'zzzzzz\n', 'a-b\n'], output)
+        self.assertEqual(output.getvalue(), 'rehtiw: Whiter, Wither, Writhe\n'
+                                            'zzzzzz: \na-b: not letters\n')
+
+    def test_train(self):
+        """Training scores found, missed and wrong words"""
+        answers = iter(['Whiter, Bogus', ''])
+        messages = []
+        index = ai.AnagramIndex()
+        index.add_words(['Whiter', 'Wither', 'Writhe'])
+        self.assertEqual(solver.train(index, 5, random.Random(1),
+                                      ask=lambda prompt: next(answers),
+                                      output=messages.append), (1, 3))
+        self.assertEqual(messages, ['Found 1 of 3: Whiter', 'Missed: Wither, Writhe',
+                                    'Not in the data: bogus'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,9 +2,42 @@
 """Test cases for process_data.py program."""
 
 import sys
+import os
+import io
+import contextlib
+import shutil
+import tempfile
 import unittest
 import process_data as pd
 
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+
+def setUpModule():
+    """Keep the results cached by the tests out of the user's cache."""
+    global CACHE_DIR, SAVED_CACHE_ENV
+    CACHE_DIR = tempfile.mkdtemp()
+    SAVED_CACHE_ENV = os.environ.get(pd.CACHE_DIR_ENV)
+    os.environ[pd.CACHE_DIR_ENV] = CACHE_DIR
+
+def tearDownModule():
+    if SAVED_CACHE_ENV is None:
+        del os.environ[pd.CACHE_DIR_ENV]
+    else:
+        os.environ[pd.CACHE_DIR_ENV] = SAVED_CACHE_ENV
+    shutil.rmtree(CACHE_DIR)
+
+def data_files(pattern='ww_data*'):
+    """Return the sorted list of data files matching pattern."""
+    import glob
+    return sorted(glob.glob(os.path.join(DATA_DIR, pattern)))
+
+def run_process_files(arg_list):
+    """Run process_files() with the given arguments; return (status, output)."""
+    output = io.StringIO()
+    with contextlib.redirect_stdout(output):
+        status = pd.process_files(pd.parse_args(arg_list))
+    return status, output.getvalue()
+
 class TestWordWarp(unittest.TestCase):
     """A class for testing the word warp processing implementation"""
 
@@ -42,6 +75,13 @@ class TestWordWarp(unittest.TestCase):
             ("Xyzzyz, Abcdef,", False),
             ("Xyzzyz,  Abcdef", True),
             ("Bagged, Capped, Impact, Waylay, Barley, Danger, Fanged", True),
+            ("Éclair", True),
+            ("Éclair, Abcdef", True),
+            ("ÉClair", False),
+            ("Eclaïr", True),
+            ("Eclai1", False),
+            ("Ab-def", False),
+            ("Ab def", False),
             ]
         for line, is_proper in PARSER_TEST_CASES:
             if is_proper:
@@ -50,6 +90,13 @@ class TestWordWarp(unittest.TestCase):
                 expected = 'Failed'
             debug_string = '"{}" should have {}'.format(line, expected)
             self.assertEqual(pd.words_okay(pd.get_words(line), False), is_proper, debug_string)
+        # Lists of words that no line splits into.
+        for word_list, is_proper in ((['Abcdef, Bcdefa'], False),
+                                     (['Abcdef', 'Bcdefa, Cdefab'], False),
+                                     (['Éclair, Abcdef'], False),
+                                     (['Abcdef', 'Bcdefa', 'Cdefab'], True),
+                                     ([], True)):
+            self.assertEqual(pd.words_okay(word_list, False), is_proper, word_list)
 
     def test_get_words(self):
         """Word Parser"""
@@ -161,11 +208,623 @@ class TestWordWarp(unittest.TestCase):
             good, reason = pd.line_is_good(line, False)
             self.assertFalse(good, debug_string)
 
+    def test_classify_line(self):
+        """Line classifier"""
+        TEST_CASES = [
+            ("", pd.SKIP),
+            ("# A comment", pd.SKIP),
+            ("Word warp 2019-08-06", pd.SKIP),
+            ("Score: 416090", pd.SKIP),
+            ("---- Bad ----", pd.END),
+            ("———", pd.END),
+            ("Whiter, Wither, Writhe", pd.GOOD),
+            ("Whiter, Writhe, Wither", pd.BAD),
+            ("Wintry,Withal", pd.BAD),
+            ]
+        for line, expected in TEST_CASES:
+            verdict = pd.classify_line(line, False)
+            self.assertEqual(verdict.kind, expected, line)
+        verdict = pd.classify_line("Seduce, Deuces", False)
+        self.assertEqual(verdict, (pd.BAD, 'Not alphabetic', ['Seduce', 'Deuces']))
+
+    def test_classify_whitespace(self):
+        """Classifier whitespace check agrees with line_space_okay()"""
+        for line in ["Abcdef", " Abcdef", "Abcdef ", "Abcdef,", ", Abcdef",
+                     "Xyzzyz, Abcdef", "Xyzzyz,  Abcdef", "Xyzzyz ,Abcdef",
+                     "Xyzzyz,\tAbcdef", "Xyzzyz,Abcdef", "Xyzzyz, Abcdef,",
+                     "Abcdef, ", "Xyzzyz, Abcdef, ", ", ", "Abcdef,\t"]:
+            verdict = pd.classify_line(line, False)
+            bad_space = verdict.reason == 'Bad whitespace.'
+            self.assertEqual(pd.line_space_okay(line, False), not bad_space, line)
+
+    def test_fix_line(self):
+        """Line fixer"""
+        TEST_CASES = [
+            ("Wintry", ("Wintry", None)),
+            ("wintry", ("Wintry", None)),
+            ("Wintry ", ("Wintry", None)),
+            ("Wintry,", ("Wintry", None)),
+            ("Addles,Saddle", ("Addles, Saddle", None)),
+            ("Saddle,  Addles", ("Addles, Saddle", None)),
+            ("Writhe, wither, Whiter, Wither", ("Whiter, Wither, Writhe", None)),
+            ("Wintry, Withal", ("Wintry, Withal", 'Not anagrams')),
+            ("Wintr", ("Wintr", 'Did not parse.')),
+            ("Wintry, Wi-try", ("Wintry, Wi-try", 'Did not parse.')),
+            (" ", (" ", 'Did not parse.')),
+            (",", (",", 'Did not parse.')),
+            ]
+        for line, expected in TEST_CASES:
+            self.assertEqual(pd.fix_line(line, False), expected, line)
+
+class TestProcessFiles(unittest.TestCase):
+    """Tests for processing whole data files."""
+
+    def test_good_files(self):
+        """Archive snapshots are all good"""
+        status, output = run_process_files(['-f'] + data_files())
+        self.assertEqual(status, 0, output)
+        self.assertEqual(output, '')
+
+    def test_bad_file(self):
+        """Bad lines in test_input are reported"""
+        status, output = run_process_files(['-f'] + data_files('test_input'))
+        self.assertEqual(status, 1)
+        self.assertIn('test_input.1254(Not alphabetic): "Seduce, Deuces"', output)
+        self.assertIn('test_input.997: "Opiate" after "Opiate"', output)
+
+    def test_parallel_matches_serial(self):
+        """--jobs output is identical to serial output"""
+        files = data_files('*')
+        for options in (['-s'], ['-v'], ['-s', '-v', '-c', '5']):
+            options.append('--no-cache')
+            serial = run_process_files(options + ['-f'] + files)
+            parallel = run_process_files(options + ['-j', '3', '-f'] + files)
+            self.assertEqual(serial, parallel, options)
+
+    def test_mmap_matches_text(self):
+        """--mmap output is identical to reading files as text"""
+        files = data_files('*')
+        for options in (['-s'], ['-v'], ['-s', '-v', '-c', '5']):
+            options.append('--no-cache')
+            text = run_process_files(options + ['-f'] + files)
+            mapped = run_process_files(options + ['-m', '-f'] + files)
+            self.assertEqual(text, mapped, options)
+
+    def test_classify_bytes_line(self):
+        """Bytes classifier agrees with the text classifier"""
+        lines = ["Action", "Addles, Saddle", "Whiter, Writhe, Wither",
+                 "Wintry,Withal", "Wintry, Withal", "WinTry", "Wintry ",
+                 "Word warp", "", "---", "Ébauche", "Éclair, Eclair"]
+        for line in lines:
+            text_verdict = pd.classify_line(line, False)
+            bytes_verdict = pd.classify_bytes_line(line.encode(), False)
+            self.assertEqual(text_verdict.kind, bytes_verdict.kind, line)
+            self.assertEqual(text_verdict.reason, bytes_verdict.reason, line)
+
+    def test_mapped_lines(self):
+        """Mapped lines are the lines of the file"""
+        for filename in data_files('*'):
+            with open(filename) as data_file:
+                expected = [line.rstrip('\n') for line in data_file]
+            lines = [line.decode() for line in pd.mapped_lines(filename)]
+            self.assertEqual(lines, expected, filename)
+
+    def test_jsonl_format(self):
+        """JSON Lines output has a record per bad line and per file"""
+        import json
+        files = data_files('test_input') + data_files('ww_data.2019_06_09')
+        status, output = run_process_files(['--format', 'jsonl', '-f'] + files)
+        self.assertEqual(status, 1)
+        records = [json.loads(line) for line in output.splitlines()]
+        bad = [record for record in records if record['type'] == 'bad']
+        stats = [record for record in records if record['type'] == 'stats']
+        self.assertEqual(len(bad) + len(stats), len(records))
+        self.assertEqual(len(bad), 32)
+        self.assertEqual(bad[0], {'type': 'bad', 'file': files[0],
+                                  'line_number': 21, 'line': 'Adorer, Roared',
+                                  'reason': 'Out of order', 'after': 'Adrift'})
+        self.assertIn({'type': 'bad', 'file': files[0], 'line_number': 1254,
+                       'line': 'Seduce, Deuces', 'reason': 'Not alphabetic'}, bad)
+        self.assertEqual([record['file'] for record in stats], files)
+        self.assertEqual(stats[0]['good_lines'], 1611)
+        self.assertEqual(stats[0]['histogram'], [1402, 178, 28, 3])
+        self.assertGreater(stats[0]['lines_per_second'], 0)
+
+    def test_cross_check(self):
+        """Cross-line collisions are reported with both locations"""
+        filename = data_files('ww_data.2019_08_06')[0]
+        status, output = run_process_files(['-x', '-f', filename])
+        self.assertEqual(status, 1)
+        self.assertIn('.1646(Anagram of {}.888): "Shaven"'.format(filename), output)
+        self.assertIn('.1995(Duplicate of "Untidy" at {}.1273): "Untidy"'.format(filename),
+                      output)
+
+    def test_cross_check_lines(self):
+        """Cross checker"""
+        cross_check = pd.CrossCheck('f')
+        self.assertIsNone(cross_check.check(1, ['Allure', 'Laurel']))
+        self.assertIsNone(cross_check.check(2, ['Havens']))
+        self.assertEqual(cross_check.check(3, ['Shaven']), 'Anagram of f.2')
+        self.assertEqual(cross_check.check(4, ['Laurel']), 'Duplicate of "Laurel" at f.1')
+
+class TestFix(unittest.TestCase):
+    """Tests for writing fixed copies of files."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_fix_test_input(self):
+        """Fixing test_input leaves no bad lines"""
+        filename = os.path.join(self.tmp_dir, 'test_input')
+        shutil.copy(data_files('test_input')[0], filename)
+        status, output = run_process_files(['--fix', '-f', filename])
+        self.assertEqual((status, output), (0, ''))
+        status, output = run_process_files(['-f', filename + pd.FIXED_SUFFIX])
+        self.assertEqual((status, output), (0, ''))
+        with open(filename + pd.FIXED_SUFFIX) as fixed_file:
+            fixed_lines = fixed_file.read().splitlines()
+        self.assertIn('Deuces, Seduce', fixed_lines)
+        self.assertEqual(fixed_lines.count('Opiate'), 1)
+        self.assertEqual(fixed_lines[-1], 'Whiter, Writhe, Wither')
+
+    def test_unfixable_lines(self):
+        """Lines that can't be fixed are reported and kept"""
+        filename = os.path.join(self.tmp_dir, 'data')
+        with open(filename, 'w') as data_file:
+            data_file.write('Word warp\n\nWintry\nAbcdef, Xyzzyz\nAction\n'
+                            'Saddle,Addles\n---\nmore\n')
+        status, output = run_process_files(['--fix', '-f', filename])
+        self.assertEqual(status, 1)
+        self.assertEqual(output, 'Bad {}.4(Not anagrams): "Abcdef, Xyzzyz"\n'.format(filename))
+        with open(filename + pd.FIXED_SUFFIX) as fixed_file:
+            self.assertEqual(fixed_file.read(), 'Word warp\n\nAbcdef, Xyzzyz\nAction\n'
+                             'Addles, Saddle\nWintry\n---\nmore\n')
+
+class TestStats(unittest.TestCase):
+    """Tests for the Stats accumulator."""
+
+    LINES = ["Action", "Addles, Saddle", "Chines, Inches, Niches", "Esteem",
+             "Evilly, Lively, Vilely", "Whiter, Wither, Writhe"]
+
+    def make_stats(self, lines, by_signature=True):
+        stats = pd.Stats(by_signature)
+        for line in lines:
+            stats.add_line(line)
+        return stats
+
+    def assertSameStats(self, stats, expected):
+        self.assertEqual(stats.as_record(), expected.as_record())
+        self.assertEqual(stats.signatures, expected.signatures)
+
+    def test_counts(self):
+        """Line, word, letter and signature counts"""
+        stats = self.make_stats(self.LINES)
+        record = stats.as_record()
+        self.assertEqual(record['good_lines'], 6)
+        self.assertEqual(record['good_words'], 13)
+        self.assertEqual(record['histogram'], [2, 1, 3])
+        self.assertEqual(record['signatures'], 6)
+        self.assertEqual(stats.letters['e'], 1 + 2*1 + 3*1 + 2 + 3*1 + 3*1)
+        self.assertEqual(sum(stats.letters.values()), 6 * 13)
+
+    def test_many_words(self):
+        """Lines with many words are counted"""
+        stats = self.make_stats([', '.join(['Abcdef'] * 12)])
+        self.assertEqual(stats.most_words, 12)
+        self.assertEqual(stats.as_record()['histogram'][-1], 1)
+
+    def test_merge(self):
+        """Merged stats match stats of all the lines"""
+        whole = self.make_stats(self.LINES)
+        first = self.make_stats(self.LINES[:2])
+        second = self.make_stats(self.LINES[2:])
+        self.assertSameStats(first + second, whole)
+        self.assertSameStats(first.merge(second), whole)
+        self.assertSameStats(first + pd.Stats(True), first)
+
+    def test_without_signatures(self):
+        """Stats not by signature have the same counts in bounded memory"""
+        stats = self.make_stats(self.LINES * 3, by_signature=False)
+        record = stats.as_record()
+        self.assertNotIn('signatures', record)
+        expected = self.make_stats(self.LINES * 3).as_record()
+        del expected['signatures']
+        self.assertEqual(record, expected)
+        more = self.make_stats(['Zircon'] * 50, by_signature=False)
+        self.assertEqual(len(more.first_letters), 1)
+        self.assertEqual(sum((stats + more).histogram.values()), 18 + 50)
+
+    def test_bytes_lines(self):
+        """Lines given as bytes count the same as text"""
+        stats = pd.Stats(True)
+        for line in self.LINES:
+            stats.add_line(line.encode(), line.encode().split(b', '))
+        self.assertSameStats(stats, self.make_stats(self.LINES))
+
+    def test_pickle(self):
+        """Stats survive pickling"""
+        import pickle
+        stats = self.make_stats(self.LINES)
+        self.assertSameStats(pickle.loads(pickle.dumps(stats)), stats)
+
+    def test_word_length(self):
+        """The stats are labelled with the word length of the game"""
+        stats = self.make_stats(self.LINES)
+        for arg_list, label in (([], 'Unique 6-letter'),
+                                (['-g', 'word_warp_5'], 'Unique 5-letter'),
+                                (['-l', '7'], 'Unique 7-letter')):
+            output = io.StringIO()
+            pd.make_writer(pd.parse_args(arg_list + ['-s']), output).write(
+                pd.stats_record('ww_data', stats, 1.0))
+            self.assertIn(label, output.getvalue())
+
+    def test_totals(self):
+        """--totals merges the stats of every file"""
+        import json
+        files = data_files()
+        status, output = run_process_files(['--totals', '--format', 'jsonl',
+                                            '-j', '2', '-f'] + files)
+        records = [json.loads(line) for line in output.splitlines()]
+        stats = [record for record in records if record['type'] == 'stats']
+        totals = records[-1]
+        self.assertEqual(totals['type'], 'totals')
+        self.assertEqual(totals['files'], len(files))
+        self.assertEqual(totals['good_lines'],
+                         sum(record['good_lines'] for record in stats))
+        self.assertEqual(totals['lines'], sum(record['lines'] for record in stats))
+
+class TestIncremental(unittest.TestCase):
+    """Tests for checking a snapshot against a previous one."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for name in ('ww_data.2019_07_30', 'ww_data.2019_08_03', 'test_input'):
+            shutil.copy(os.path.join(DATA_DIR, name), self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def tmp_file(self, name):
+        return os.path.join(self.tmp_dir, name)
+
+    def test_matches_full_check(self):
+        """Incremental check gives the same results as a full check"""
+        previous = self.tmp_file('ww_data.2019_07_30')
+        run_process_files(['--save_verdicts', '-f', previous])
+        self.assertTrue(os.path.exists(pd.verdict_filename(previous)))
+        for name in ('ww_data.2019_08_03', 'test_input'):
+            files = ['-s', '-f', self.tmp_file(name)]
+            full = run_process_files(files)
+            incremental = run_process_files(['-p', previous] + files)
+            self.assertEqual(full, incremental, name)
+
+    def test_cross_check_verdicts(self):
+        """Lines --cross_check finds bad are saved as bad and not counted"""
+        import json
+        filename = self.tmp_file('cross_check')
+        with open(filename, 'w') as data_file:
+            data_file.write('Allure, Laurel\nHavens\nLaurel\nShaven\nZircon\n')
+        status, output = run_process_files(['-x', '--save_verdicts', '--format', 'jsonl',
+                                            '-s', '-f', filename])
+        self.assertEqual(status, 1)
+        records = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual([record['line_number'] for record in records
+                          if record['type'] == 'bad'], [3, 4])
+        self.assertEqual(records[-1]['good_lines'], 3)
+        self.assertEqual(list(pd.read_good_lines(filename)),
+                         ['Allure, Laurel', 'Havens', 'Zircon'])
+
+    def test_known_good_lines(self):
+        """Only lines good in the previous snapshot are known good"""
+        previous = self.tmp_file('test_input')
+        run_process_files(['--save_verdicts', '-f', previous])
+        good_lines = list(pd.read_good_lines(previous))
+        self.assertEqual(good_lines, sorted(set(good_lines)))
+        self.assertNotIn('Seduce, Deuces', good_lines)
+        self.assertIn('Zircon', good_lines)
+        known_good = pd.KnownGood(good_lines)
+        self.assertTrue(known_good.contains('Abased'))
+        self.assertFalse(known_good.contains('Abbbbb'))
+        self.assertTrue(known_good.contains('Zircon'))
+        self.assertEqual(known_good.hits, 2)
+
+    def test_stale_verdicts(self):
+        """Verdicts for a different version of a file are not used"""
+        previous = self.tmp_file('ww_data.2019_07_30')
+        run_process_files(['--save_verdicts', '-f', previous])
+        with open(previous, 'a') as data_file:
+            data_file.write('Zzzzzz\n')
+        self.assertEqual(list(pd.read_good_lines(previous)), [])
+        # The same size and time, but not the same contents.
+        run_process_files(['--save_verdicts', '-f', previous])
+        status = os.stat(previous)
+        with open(previous, 'r+') as data_file:
+            data_file.seek(status.st_size - len('Zzzzzz\n'))
+            data_file.write('Zzzzzy\n')
+        os.utime(previous, ns=(status.st_atime_ns, status.st_mtime_ns))
+        self.assertEqual(list(pd.read_good_lines(previous)), [])
+
+    def test_other_game_verdicts(self):
+        """Verdicts saved for another game or word length are not used"""
+        previous = self.tmp_file('ww_data.2019_07_30')
+        run_process_files(['--save_verdicts', '-f', previous])
+        self.assertNotEqual(list(pd.read_good_lines(previous)), [])
+        for game in (pd.rules.get_rules('word_warp_5').game,
+                     pd.rules.get_rules('word_warp_5', 6).game,
+                     pd.rules.get_rules(letters=7).game):
+            self.assertEqual(list(pd.read_good_lines(previous, game=game)), [], game)
+        status, output = run_process_files(['-v', '-g', 'word_warp_5', '-p', previous,
+                                            '-f', self.tmp_file('ww_data.2019_08_03')])
+        self.assertIn('Reused 0 verdicts', output)
+
+class TestWatch(unittest.TestCase):
+    """Tests for checking files again when they change."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'ww_data.watched')
+        self.other = os.path.join(self.tmp_dir, 'ww_data.other')
+        shutil.copy(data_files('ww_data.2019_07_30')[0], self.other)
+        self.records = []
+        args = pd.parse_args(['-w', '-f', self.filename, self.other])
+        self.watcher = pd.FileWatcher(args, self.records.append)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def write_lines(self, *lines):
+        with open(self.filename, 'w') as data_file:
+            data_file.write('\n'.join(lines) + '\n')
+
+    def bad_lines(self):
+        """Return and forget (line number, line) of the bad lines reported."""
+        bad = [(record['line_number'], record['line'])
+               for record in self.records if record['type'] == 'bad']
+        self.records.clear()
+        return bad
+
+    def test_only_changed_files(self):
+        """Only new or changed files are checked"""
+        self.assertEqual(self.watcher.poll(), [self.other])
+        self.write_lines('Action')
+        self.assertEqual(self.watcher.poll(), [self.filename])
+        self.assertEqual(self.watcher.poll(), [])
+        self.write_lines('Action', 'Wintry')
+        self.assertEqual(self.watcher.poll(), [self.filename])
+
+    def test_new_diagnostics(self):
+        """Bad lines are reported once, however they move"""
+        self.write_lines('Action', 'abcdef', 'Saddle,Addles')
+        self.watcher.poll()
+        self.assertEqual(self.bad_lines(), [(2, 'abcdef'), (3, 'Saddle,Addles')])
+        self.write_lines('Abased', 'Action', 'abcdef', 'Saddle,Addles', 'Wintry, Xyzzyz')
+        self.watcher.poll()
+        self.assertEqual(self.bad_lines(), [(5, 'Wintry, Xyzzyz')])
+        self.assertFalse(self.watcher.results[self.filename])
+        self.write_lines('Abased', 'Action', 'Wintry, Xyzzyz')
+        self.watcher.poll()
+        self.assertEqual(self.records[-1], {'type': 'cleared', 'file': self.filename,
+                                            'count': 2})
+        self.assertEqual(self.bad_lines(), [])
+        self.write_lines('Abased', 'Action', 'Wintry')
+        self.watcher.poll()
+        self.assertTrue(self.watcher.results[self.filename])
+
+class TestStartup(unittest.TestCase):
+    """Tests that importing process_data.py stays quick."""
+
+    # Modules only some modes need, so they are imported where they are used.
+    LAZY_MODULES = {'readline', 'argparse', 'glob', 'unicodedata', 'fileinput'}
+    # Generous, so that only a real regression (such as a new heavy import
+    # at module level) fails it.  Measured at about 20ms.
+    IMPORT_BUDGET_US = 100000
+
+    def import_times(self):
+        """Return {module: cumulative import time in microseconds} for
+        importing process_data in a new interpreter."""
+        import subprocess
+        result = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                                 'import process_data'],
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                stderr=subprocess.PIPE, universal_newlines=True,
+                                check=True)
+        times = {}
+        for line in result.stderr.splitlines():
+            if line.startswith('import time:') and '|' in line:
+                _, cumulative, module = line.split('|')
+                if cumulative.strip().isdigit():
+                    times[module.strip()] = int(cumulative)
+        return times
+
+    def test_lazy_imports(self):
+        """Importing process_data does not import modules it can do without"""
+        times = self.import_times()
+        self.assertIn('process_data', times)
+        self.assertEqual(self.LAZY_MODULES & set(times), set())
+        self.assertLess(times['process_data'], self.IMPORT_BUDGET_US)
+
+    def test_files_default(self):
+        """The data files are only looked for when they will be read"""
+        self.assertIsNone(pd.parse_args(['--test']).files)
+        self.assertIsNone(pd.parse_args(['--interactive']).files)
+        self.assertIsInstance(pd.parse_args([]).files, list)
+
+class TestCache(unittest.TestCase):
+    """Tests for the cache of results."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.cache_args = ['--cache_dir', os.path.join(self.tmp_dir, 'cache')]
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def copy(self, name, new_name):
+        new_name = os.path.join(self.tmp_dir, new_name)
+        shutil.copy(os.path.join(DATA_DIR, name), new_name)
+        return new_name
+
+    def test_cached_output(self):
+        """Results from the cache give the same output, under any name"""
+        first = self.copy('test_input', 'first')
+        second = self.copy('test_input', 'second')
+        for options in (['-s'], ['-v', '-x'], ['--format', 'jsonl', '-c', '50']):
+            expected = run_process_files(['--no-cache'] + options + ['-f', second])
+            run_process_files(self.cache_args + options + ['-f', first])
+            cached = run_process_files(self.cache_args + options + ['-f', second])
+            if options[0] == '--format':
+                # Only the timings differ.
+                expected = (expected[0], expected[1].split('"elapsed"')[0])
+                cached = (cached[0], cached[1].split('"elapsed"')[0])
+            self.assertEqual(expected, cached, options)
+
+    def test_unusable_cache(self):
+        """Files are checked without the cache if it cannot be opened"""
+        filename = self.copy('test_input', 'test_input')
+        expected = run_process_files(['--no-cache', '-f', filename])
+        not_a_dir = self.copy('test_input', 'not_a_dir')
+        bad_db = os.path.join(self.tmp_dir, 'bad_db')
+        os.makedirs(os.path.join(bad_db, pd.CACHE_FILE))
+        for directory in (os.path.join(not_a_dir, 'cache'), bad_db):
+            errors = io.StringIO()
+            with contextlib.redirect_stderr(errors):
+                result = run_process_files(['--cache_dir', directory, '-f', filename])
+            self.assertEqual(result, expected, directory)
+            self.assertIn('Not caching results', errors.getvalue())
+
+    def test_hits_and_changes(self):
+        """Unchanged files are answered from the cache; changed ones are not"""
+        filename = self.copy('ww_data.2019_07_30', 'ww_data')
+        args = pd.parse_args(self.cache_args + ['-f', filename])
+        cache = pd.ResultCache(pd.cache_dir(args), 1 << 20)
+        try:
+            key, result = pd.cached_result(cache, filename, args)
+            self.assertIsNone(result)
+            list(pd.check_files([filename], args, cache))
+            key, result = pd.cached_result(cache, filename, args)
+            self.assertTrue(result[0])
+            self.assertTrue(result[2][-1]['cached'])
+            with open(filename) as data_file:
+                lines = data_file.read()
+            with open(filename, 'w') as data_file:
+                data_file.write('abcdef\n' + lines)
+            self.assertIsNone(pd.cached_result(cache, filename, args)[1])
+            succeeded, stats, records = next(pd.check_files([filename], args, cache))
+            self.assertFalse(succeeded)
+            self.assertFalse(pd.cached_result(cache, filename, args)[1][0])
+        finally:
+            cache.close()
+
+    def test_cached_by_program(self):
+        """Results cached by running the program can be read when imported"""
+        import subprocess
+        filename = self.copy('ww_data.2019_07_30', 'ww_data')
+        subprocess.run([sys.executable, pd.__file__] + self.cache_args + ['-f', filename],
+                       check=True)
+        args = pd.parse_args(self.cache_args + ['-f', filename])
+        cache = pd.ResultCache(pd.cache_dir(args), 1 << 20)
+        try:
+            succeeded, stats, records = pd.cached_result(cache, filename, args)[1]
+        finally:
+            cache.close()
+        self.assertTrue(succeeded)
+        self.assertIsInstance(stats, pd.Stats)
+        self.assertGreater(stats.good_lines, 1000)
+
+    def test_eviction(self):
+        """The least recently used results are dropped to stay under size"""
+        import pickle
+        result = (True, pd.Stats(), [{'type': 'x', 'pad': 'x' * 200}])
+        size = len(pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+        cache = pd.ResultCache(self.tmp_dir, 3 * size + size // 2)
+        try:
+            for key in ('a', 'b', 'c'):
+                cache.put(key, result)
+            self.assertIsNotNone(cache.get('a', 'file'))
+            cache.put('d', result)
+            self.assertIsNotNone(cache.get('a', 'file'))
+            self.assertIsNone(cache.get('b', 'file'))
+            self.assertIsNotNone(cache.get('d', 'file'))
+            cache.put('e', (True, pd.Stats(), [{'type': 'x', 'pad': 'x' * 4 * size}]))
+            self.assertIsNone(cache.get('e', 'file'))
+        finally:
+            cache.close()
+
+    def test_bypass(self):
+        """The cache is not used where it would change what happens"""
+        for options in (['--no-cache'], ['--save_verdicts'], ['-p', 'old'], ['-D']):
+            args = pd.parse_args(options + ['-f', 'ww_data'])
+            self.assertFalse(pd.use_cache(args, args.files), options)
+        self.assertFalse(pd.use_cache(pd.parse_args(['-f', '-']), ['-']))
+        self.assertTrue(pd.use_cache(pd.parse_args(['-f', 'ww_data']), ['ww_data']))
+
+class TestPaste(unittest.TestCase):
+    """Tests for checking typed or pasted lines in batches."""
+
+    def test_pasted_lines(self):
+        """Input already waiting after a line is read joins its batch"""
+        read_fd, write_fd = os.pipe()
+        typed = iter(['Abased', 'Zircon', ''])
+        try:
+            batches = pd.get_pasted_lines('> ', lambda prompt: next(typed), read_fd)
+            os.write(write_fd, b'Action\nAddles, Saddle\n')
+            self.assertEqual(next(batches), ['Abased', 'Action', 'Addles, Saddle'])
+            self.assertEqual(next(batches), ['Zircon'])
+            self.assertEqual(list(batches), [])
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+
+    def test_batches(self):
+        """Batches are checked in order with each other, and summarized"""
+        records = []
+        checker = pd.InputChecker(pd.parse_args(['-i', '-x']), records.append)
+        self.assertEqual(checker.check(['Word warp', 'Abased', 'Action', 'abcdef']),
+                         {'type': 'summary', 'file': pd.INPUT_NAME, 'lines': 4,
+                          'good': 2, 'bad': 1, 'skipped': 1})
+        summary = checker.check(['Accord', 'Addles, Saddle', 'Saddle'])
+        self.assertEqual((summary['good'], summary['bad']), (1, 2))
+        self.assertEqual([(record['line_number'], record['reason']) for record in records],
+                         [(4, 'Did not parse.'), (5, pd.OUT_OF_ORDER),
+                          (7, 'Duplicate of "Saddle" at {}.6'.format(pd.INPUT_NAME))])
+
+    def test_end(self):
+        """Checking stops at an end line, as it does in a file"""
+        records = []
+        checker = pd.InputChecker(pd.parse_args(['-i']), records.append)
+        self.assertEqual(checker.check(['Action', '---', 'Junk, Line', 'Abased']),
+                         {'type': 'summary', 'file': pd.INPUT_NAME, 'lines': 2,
+                          'good': 1, 'bad': 0, 'skipped': 1})
+        self.assertTrue(checker.ended)
+        self.assertEqual(checker.check(['Junk']),
+                         {'type': 'summary', 'file': pd.INPUT_NAME, 'lines': 0,
+                          'good': 0, 'bad': 0, 'skipped': 0})
+        self.assertEqual(records, [])
+
+    def test_needs_terminal(self):
+        """--paste is refused when standard input is not a terminal"""
+        read_fd, write_fd = os.pipe()
+        os.close(write_fd)
+        stdin = sys.stdin
+        try:
+            with open(read_fd) as sys.stdin, \
+                 contextlib.redirect_stderr(io.StringIO()):
+                self.assertRaises(SystemExit, pd.parse_args, ['--paste'])
+        finally:
+            sys.stdin = stdin
+
 def main():
     """Run tests contained in this module."""
     runner = unittest.TextTestRunner()
     loader = unittest.TestLoader()
-    test_suite = loader.loadTestsFromTestCase(TestWordWarp)
+    test_suite = unittest.TestSuite()
+    for test_case in (TestWordWarp, TestProcessFiles, TestFix, TestStats,
+                      TestIncremental, TestWatch, TestStartup, TestCache,
+                      TestPaste):
+        test_suite.addTests(loader.loadTestsFromTestCase(test_case))
     result = runner.run(test_suite)
     if result.wasSuccessful():
         return 0